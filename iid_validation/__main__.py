@@ -5,18 +5,21 @@ import enum
 import importlib.metadata
 import logging
 import os
+import shutil
+import signal
 import sys
 from pathlib import Path
 
 import numpy as np
 
-from . import config, iid_test, min_entropy, statistical_analysis
+from . import config, iid_test, min_entropy, permutation_tests, statistical_analysis
 
 
 class ReturnValue(enum.IntEnum):
     OK = 0
     BAD_CONFIG = 1
     FAILED_ANALYSIS = 2
+    INTERRUPTED = 3
 
 
 def main() -> int:
@@ -53,6 +56,56 @@ def main() -> int:
         action=argparse.BooleanOptionalAction,
         help=f"Run the program in parallel mode [Default: {config.Config.DEFAULT_PARALLEL}].",
     )
+    global_args.add_argument(
+        "--executor",
+        choices=permutation_tests.EXECUTORS,
+        help="Executor of the permutations in parallel mode, --no-parallel selects serial "
+        f"[Default: {config.Config.DEFAULT_EXECUTOR}].",
+    )
+    global_args.add_argument(
+        "--workers",
+        type=int,
+        help="Number of parallel workers, 0 for one worker per available CPU "
+        f"[Default: {config.Config.DEFAULT_WORKERS}].",
+    )
+    global_args.add_argument(
+        "--start_method",
+        choices=permutation_tests.START_METHODS,
+        help="Start method of the worker processes with the process executor [Default: platform default].",
+    )
+    global_args.add_argument(
+        "--pin_workers",
+        action=argparse.BooleanOptionalAction,
+        help=f"Pin each parallel worker to a single CPU [Default: {config.Config.DEFAULT_PIN_WORKERS}].",
+    )
+    global_args.add_argument(
+        "--backend",
+        choices=permutation_tests.BACKENDS,
+        help=f"Implementation of the test statistics [Default: {config.Config.DEFAULT_BACKEND}].",
+    )
+    global_args.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of permutations to shuffle and test at once, as a single array (numpy backend only) "
+        f"[Default: {config.Config.DEFAULT_BATCH_SIZE}].",
+    )
+    global_args.add_argument(
+        "--chunk_size",
+        type=int,
+        help="Number of permutations run by each parallel task, 0 to choose it automatically "
+        f"[Default: {config.Config.DEFAULT_CHUNK_SIZE}].",
+    )
+    global_args.add_argument(
+        "--seed",
+        type=int,
+        help="Seed of the random permutations, to reproduce a previous run [Default: a new random seed].",
+    )
+    global_args.add_argument(
+        "--resume",
+        metavar="RESULTS_DIR",
+        type=str,
+        help="Resume an interrupted run in its results directory, from the last checkpoint of its NIST test.",
+    )
     global_args.add_argument(
         "-d",
         "--debug",
@@ -107,6 +160,37 @@ def main() -> int:
             f"[Default: {config.Config.NISTConfig.DEFAULT_PLOT}]."
         ),
     )
+    nist_args.add_argument(
+        "--early_stop",
+        action=argparse.BooleanOptionalAction,
+        help=(
+            "Stop computing permutations as soon as the IID result is decided "
+            f"[Default: {config.Config.NISTConfig.DEFAULT_EARLY_STOP}]."
+        ),
+    )
+    nist_args.add_argument(
+        "--save_values",
+        action=argparse.BooleanOptionalAction,
+        help=(
+            "Save the test values of the permutations to test_values.bin "
+            f"[Default: {config.Config.NISTConfig.DEFAULT_SAVE_VALUES}]."
+        ),
+    )
+    nist_args.add_argument(
+        "--reduce_in_workers",
+        action=argparse.BooleanOptionalAction,
+        help=(
+            "Reduce the test values to counters and histograms in the parallel workers, which requires "
+            "--no-save_values and --no-early_stop "
+            f"[Default: {config.Config.NISTConfig.DEFAULT_REDUCE_IN_WORKERS}]."
+        ),
+    )
+    nist_args.add_argument(
+        "--checkpoint_interval",
+        type=int,
+        help="Number of permutations between checkpoints of the run, 0 to disable checkpoints "
+        f"[Default: {config.Config.NISTConfig.DEFAULT_CHECKPOINT_INTERVAL}].",
+    )
     nist_args.add_argument(
         "--nist_p",
         metavar="P",
@@ -152,6 +236,12 @@ def main() -> int:
         help="Single lag parameter p used for periodicity and covariance tests "
         f"[Default: {config.Config.StatConfig.DEFAULT_P}]",
     )
+    stat_args.add_argument(
+        "--stat_parallel_iterations",
+        action=argparse.BooleanOptionalAction,
+        help="Run whole iterations on the parallel workers, instead of the permutations of each iteration "
+        f"[Default: {config.Config.StatConfig.DEFAULT_PARALLEL_ITERATIONS}].",
+    )
 
     args = parser.parse_args()
     try:
@@ -160,17 +250,29 @@ def main() -> int:
         logger.error(e)
         return ReturnValue.BAD_CONFIG
 
+    # SIGTERM, e.g. from a scheduler preempting the run, interrupts it like SIGINT (Ctrl-C)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
     rv = ReturnValue.OK
-    # Create results folder and move into it
-    current_run_date = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_name = Path(conf.input_file).stem  # Extracts the file name from the full path
-    dir_name = f"{file_name}@{current_run_date}"
-    results_dir = os.path.join("iid_results", dir_name)
-    os.makedirs(results_dir, exist_ok=True)
-    with contextlib.chdir(results_dir):
+    if conf.resume:
+        # Resume in the results folder of the interrupted run
+        results_dir = conf.resume
+        dir_name = os.path.basename(results_dir)
+    else:
+        # Create results folder
+        current_run_date = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_name = Path(conf.input_file).stem  # Extracts the file name from the full path
+        dir_name = f"{file_name}@{current_run_date}"
+        results_dir = os.path.join("iid_results", dir_name)
+        os.makedirs(results_dir, exist_ok=True)
+    # The workers running the permutations are shared by the NIST test and the statistical analysis
+    with (
+        contextlib.chdir(results_dir),
+        permutation_tests.WorkerPool(conf.executor, conf.workers, conf.start_method, conf.pin_workers) as pool,
+    ):
         # Configure logging
         # Write all loggers to file, each with their own level, from DEBUG up
-        f_handler = logging.FileHandler(f"{dir_name}.log", mode="w")
+        f_handler = logging.FileHandler(f"{dir_name}.log", mode="a" if conf.resume else "w")
         f_handler.setLevel(logging.DEBUG)
         f_handler.setFormatter(logging.Formatter("%(asctime)s %(name)-28s %(levelname)-8s %(message)s"))
         logger.addHandler(f_handler)
@@ -190,33 +292,43 @@ def main() -> int:
         np.set_printoptions(suppress=True, threshold=np.inf, linewidth=np.inf, formatter={"float": "{:0.6f}".format})
 
         # Save configuration parameters in the results folder
-        conf.to_json_file("configuration.json")
+        conf.to_json_file(config.Config.RESULTS_CONFIG_FILE)
         logger.debug(conf.dump())
 
-        if conf.nist_test:
-            os.makedirs("IID_validation", exist_ok=True)
-            with contextlib.chdir("IID_validation"):
-                try:
-                    iid_test.iid_test_function(conf)
-                except Exception as e:
-                    logger.error("NIST TEST failed: %s", e)
-                    rv = ReturnValue.FAILED_ANALYSIS
-        if conf.statistical_analysis:
-            os.makedirs("statistical_analysis", exist_ok=True)
-            with contextlib.chdir("statistical_analysis"):
-                try:
-                    statistical_analysis.statistical_analysis_function(conf)
-                except Exception as e:
-                    logger.error("Statistical analysis failed: %s", e)
-                    rv = ReturnValue.FAILED_ANALYSIS
-        if conf.min_entropy:
-            os.makedirs("min_entropy", exist_ok=True)
-            with contextlib.chdir("min_entropy"):
-                try:
-                    min_entropy.min_entropy_function(conf)
-                except Exception as e:
-                    logger.error("Min-entropy failed: %s", e)
-                    rv = ReturnValue.FAILED_ANALYSIS
+        try:
+            if conf.nist_test:
+                os.makedirs("IID_validation", exist_ok=True)
+                with contextlib.chdir("IID_validation"):
+                    try:
+                        iid_test.iid_test_function(conf, pool)
+                    except Exception as e:
+                        logger.error("NIST TEST failed: %s", e)
+                        rv = ReturnValue.FAILED_ANALYSIS
+            if conf.statistical_analysis:
+                # Only the NIST test is resumed, the statistical analysis is run again from the start
+                if conf.resume:
+                    shutil.rmtree("statistical_analysis", ignore_errors=True)
+                os.makedirs("statistical_analysis", exist_ok=True)
+                with contextlib.chdir("statistical_analysis"):
+                    try:
+                        statistical_analysis.statistical_analysis_function(conf, pool)
+                    except Exception as e:
+                        logger.error("Statistical analysis failed: %s", e)
+                        rv = ReturnValue.FAILED_ANALYSIS
+            if conf.min_entropy:
+                if conf.resume:
+                    shutil.rmtree("min_entropy", ignore_errors=True)
+                os.makedirs("min_entropy", exist_ok=True)
+                with contextlib.chdir("min_entropy"):
+                    try:
+                        min_entropy.min_entropy_function(conf)
+                    except Exception as e:
+                        logger.error("Min-entropy failed: %s", e)
+                        rv = ReturnValue.FAILED_ANALYSIS
+        except KeyboardInterrupt:
+            logger.warning("Run interrupted")
+            pool.terminate()
+            rv = ReturnValue.INTERRUPTED
     return rv
 
 
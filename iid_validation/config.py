@@ -18,12 +18,28 @@ class Config:
     DEFAULT_HASH_ALGORITHM = "sha256"
 
     DEFAULT_CONFIG_FILE = "conf.toml"
+    # Configuration saved in the results directory of each run
+    RESULTS_CONFIG_FILE = "configuration.json"
     DEFAULT_SYMBOL_LENGTH = 4
     DEFAULT_ALPHABET_SIZE = 2**DEFAULT_SYMBOL_LENGTH
     DEFAULT_NIST_TEST = True
     DEFAULT_STATISTICAL_ANALYSIS = True
     DEFAULT_MINIMUM_ENTROPY = True
     DEFAULT_PARALLEL = True
+    DEFAULT_EXECUTOR = permutation_tests.EXECUTOR_PROCESS
+    # 0 workers selects one worker per CPU
+    DEFAULT_WORKERS = 0
+    # No start method selects the default start method of the worker processes on the platform
+    DEFAULT_START_METHOD = None
+    DEFAULT_PIN_WORKERS = False
+    DEFAULT_BACKEND = permutation_tests.BACKEND_NUMPY
+    DEFAULT_BATCH_SIZE = 1
+    # Chunk size 0 selects the number of permutations per parallel task automatically
+    DEFAULT_CHUNK_SIZE = 0
+    # No seed selects a new random seed for each run
+    DEFAULT_SEED = None
+    # No results directory starts a new run
+    DEFAULT_RESUME = None
     DEFAULT_DEBUG = False
 
     _input_file: str
@@ -34,6 +50,15 @@ class Config:
     _statistical_analysis: bool
     _min_entropy: bool
     _parallel: bool
+    _executor: str
+    _workers: int
+    _start_method: str | None
+    _pin_workers: bool
+    _backend: str
+    _batch_size: int
+    _chunk_size: int
+    _seed: int | None
+    _resume: str | None
     _debug: bool
 
     class NISTConfig:
@@ -42,14 +67,25 @@ class Config:
         DEFAULT_N_PERMUTATIONS = 10000
         DEFAULT_FIRST_SEQ = True
         DEFAULT_PLOT = True
+        DEFAULT_EARLY_STOP = False
+        DEFAULT_SAVE_VALUES = True
+        DEFAULT_REDUCE_IN_WORKERS = False
+        # Checkpoint interval 0 disables checkpoints
+        DEFAULT_CHECKPOINT_INTERVAL = 0
         # Default NIST values for lag parameter p
         DEFAULT_P = [1, 2, 8, 16, 32]
+        # Largest lag parameter p, stored as an unsigned int in test_values.bin
+        MAX_P = 2**32 - 1
 
         _selected_tests: list[int]
         _n_symbols: int
         _n_permutations: int
         _first_seq: bool
         _plot: bool
+        _early_stop: bool
+        _save_values: bool
+        _reduce_in_workers: bool
+        _checkpoint_interval: int
         _p: list[int]
 
         def __init__(self) -> None:
@@ -62,6 +98,10 @@ class Config:
             self._n_permutations = self.DEFAULT_N_PERMUTATIONS
             self._first_seq = self.DEFAULT_FIRST_SEQ
             self._plot = self.DEFAULT_PLOT
+            self._early_stop = self.DEFAULT_EARLY_STOP
+            self._save_values = self.DEFAULT_SAVE_VALUES
+            self._reduce_in_workers = self.DEFAULT_REDUCE_IN_WORKERS
+            self._checkpoint_interval = self.DEFAULT_CHECKPOINT_INTERVAL
             self._p = self.DEFAULT_P
 
         @property
@@ -84,6 +124,22 @@ class Config:
         def plot(self) -> bool:
             return self._plot
 
+        @property
+        def early_stop(self) -> bool:
+            return self._early_stop
+
+        @property
+        def save_values(self) -> bool:
+            return self._save_values
+
+        @property
+        def reduce_in_workers(self) -> bool:
+            return self._reduce_in_workers
+
+        @property
+        def checkpoint_interval(self) -> int:
+            return self._checkpoint_interval
+
         @property
         def p(self) -> list[int]:
             return self._p
@@ -94,12 +150,14 @@ class Config:
         DEFAULT_N_PERMUTATIONS = 200
         DEFAULT_N_ITERATIONS = 500
         DEFAULT_P = 2
+        DEFAULT_PARALLEL_ITERATIONS = False
 
         _selected_tests: list[int]
         _n_symbols: int
         _n_permutations: int
         _n_iterations: int
         _p: int
+        _parallel_iterations: bool
 
         def __init__(self) -> None:
             self._set_defaults()
@@ -111,6 +169,7 @@ class Config:
             self._n_permutations = self.DEFAULT_N_PERMUTATIONS
             self._n_iterations = self.DEFAULT_N_ITERATIONS
             self._p = self.DEFAULT_P
+            self._parallel_iterations = self.DEFAULT_PARALLEL_ITERATIONS
 
         @property
         def selected_tests(self) -> list[int]:
@@ -132,6 +191,10 @@ class Config:
         def p(self) -> int:
             return self._p
 
+        @property
+        def parallel_iterations(self) -> bool:
+            return self._parallel_iterations
+
     def __init__(self, args: argparse.Namespace) -> None:
         """Construct a Config object from the passed command line arguments.
 
@@ -151,6 +214,8 @@ class Config:
 
         self._validate()
 
+        self._backend = permutation_tests.resolve_backend(self._backend)
+
     def _set_defaults(self) -> None:
         """Initialise member variables to default values."""
         self._input_file = ""
@@ -161,6 +226,15 @@ class Config:
         self._statistical_analysis = self.DEFAULT_STATISTICAL_ANALYSIS
         self._min_entropy = self.DEFAULT_MINIMUM_ENTROPY
         self._parallel = self.DEFAULT_PARALLEL
+        self._executor = self.DEFAULT_EXECUTOR
+        self._workers = self.DEFAULT_WORKERS
+        self._start_method = self.DEFAULT_START_METHOD
+        self._pin_workers = self.DEFAULT_PIN_WORKERS
+        self._backend = self.DEFAULT_BACKEND
+        self._batch_size = self.DEFAULT_BATCH_SIZE
+        self._chunk_size = self.DEFAULT_CHUNK_SIZE
+        self._seed = self.DEFAULT_SEED
+        self._resume = self.DEFAULT_RESUME
         self._debug = self.DEFAULT_DEBUG
 
     def _read_conf(self, file: str | None) -> dict[str, typing.Any]:
@@ -284,6 +358,110 @@ class Config:
 
                 self._parallel = parallel
 
+            if "executor" in conf["global"]:
+                executor = conf["global"]["executor"]
+                if executor not in permutation_tests.EXECUTORS:
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "executor",
+                        f"one of {permutation_tests.EXECUTORS}",
+                    )
+
+                self._executor = executor
+
+            if "workers" in conf["global"]:
+                workers = conf["global"]["workers"]
+                if not isinstance(workers, int):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "workers",
+                        "int",
+                    )
+
+                self._workers = workers
+
+            if "start_method" in conf["global"]:
+                start_method = conf["global"]["start_method"]
+                if start_method not in permutation_tests.START_METHODS:
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "start_method",
+                        f"one of {permutation_tests.START_METHODS}",
+                    )
+
+                self._start_method = start_method
+
+            if "pin_workers" in conf["global"]:
+                pin_workers = conf["global"]["pin_workers"]
+                if not isinstance(pin_workers, bool):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "pin_workers",
+                        "bool",
+                    )
+
+                self._pin_workers = pin_workers
+
+            if "backend" in conf["global"]:
+                backend = conf["global"]["backend"]
+                if backend not in permutation_tests.BACKENDS:
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "backend",
+                        f"one of {permutation_tests.BACKENDS}",
+                    )
+
+                self._backend = backend
+
+            if "batch_size" in conf["global"]:
+                batch_size = conf["global"]["batch_size"]
+                if not isinstance(batch_size, int):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "batch_size",
+                        "int",
+                    )
+
+                self._batch_size = batch_size
+
+            if "chunk_size" in conf["global"]:
+                chunk_size = conf["global"]["chunk_size"]
+                if not isinstance(chunk_size, int):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "chunk_size",
+                        "int",
+                    )
+
+                self._chunk_size = chunk_size
+
+            if "seed" in conf["global"]:
+                seed = conf["global"]["seed"]
+                if not isinstance(seed, int):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "global",
+                        "seed",
+                        "int",
+                    )
+
+                self._seed = seed
+
             if "debug" in conf["global"]:
                 debug = conf["global"]["debug"]
                 if not isinstance(debug, bool):
@@ -375,6 +553,58 @@ class Config:
 
                 self.nist._plot = nist_plot
 
+            if "early_stop" in conf["nist_test"]:
+                nist_early_stop = conf["nist_test"]["early_stop"]
+                if not isinstance(nist_early_stop, bool):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "nist_test",
+                        "early_stop",
+                        "bool",
+                    )
+
+                self.nist._early_stop = nist_early_stop
+
+            if "save_values" in conf["nist_test"]:
+                nist_save_values = conf["nist_test"]["save_values"]
+                if not isinstance(nist_save_values, bool):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "nist_test",
+                        "save_values",
+                        "bool",
+                    )
+
+                self.nist._save_values = nist_save_values
+
+            if "reduce_in_workers" in conf["nist_test"]:
+                nist_reduce_in_workers = conf["nist_test"]["reduce_in_workers"]
+                if not isinstance(nist_reduce_in_workers, bool):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "nist_test",
+                        "reduce_in_workers",
+                        "bool",
+                    )
+
+                self.nist._reduce_in_workers = nist_reduce_in_workers
+
+            if "checkpoint_interval" in conf["nist_test"]:
+                nist_checkpoint_interval = conf["nist_test"]["checkpoint_interval"]
+                if not isinstance(nist_checkpoint_interval, int):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "nist_test",
+                        "checkpoint_interval",
+                        "int",
+                    )
+
+                self.nist._checkpoint_interval = nist_checkpoint_interval
+
             if "p" in conf["nist_test"]:
                 nist_p = conf["nist_test"]["p"]
                 if (not isinstance(nist_p, list)) or (not all(isinstance(i, int) for i in nist_p)):
@@ -393,6 +623,13 @@ class Config:
                         "p",
                         "p",
                     )
+                elif len(set(nist_p)) != len(nist_p):
+                    logger.error(
+                        "%s: %s: parameter %s has repeated values",
+                        self._config_file,
+                        "nist_test",
+                        "p",
+                    )
 
                 self.nist._p = nist_p
 
@@ -482,6 +719,19 @@ class Config:
 
                 self.stat._p = stat_p
 
+            if "parallel_iterations" in conf["statistical_analysis"]:
+                stat_parallel_iterations = conf["statistical_analysis"]["parallel_iterations"]
+                if not isinstance(stat_parallel_iterations, bool):
+                    logger.error(
+                        "%s: %s: invalid configuration parameter %s (expected %s)",
+                        self._config_file,
+                        "statistical_analysis",
+                        "parallel_iterations",
+                        "bool",
+                    )
+
+                self.stat._parallel_iterations = stat_parallel_iterations
+
     def _apply_args(self, args: argparse.Namespace) -> None:
         """Update the Config object with the supplied command-line arguments.
 
@@ -501,6 +751,24 @@ class Config:
             self._min_entropy = args.min_entropy
         if args.parallel is not None:
             self._parallel = args.parallel
+        if args.executor is not None:
+            self._executor = args.executor
+        if args.workers is not None:
+            self._workers = args.workers
+        if args.start_method is not None:
+            self._start_method = args.start_method
+        if args.pin_workers is not None:
+            self._pin_workers = args.pin_workers
+        if args.backend is not None:
+            self._backend = args.backend
+        if args.batch_size is not None:
+            self._batch_size = args.batch_size
+        if args.chunk_size is not None:
+            self._chunk_size = args.chunk_size
+        if args.seed is not None:
+            self._seed = args.seed
+        if args.resume is not None:
+            self._resume = os.path.abspath(os.path.expanduser(args.resume))
         if args.debug is not None:
             self._debug = args.debug
         # NIST IID tests
@@ -514,6 +782,14 @@ class Config:
             self.nist._first_seq = args.first_seq
         if args.plot is not None:
             self.nist._plot = args.plot
+        if args.early_stop is not None:
+            self.nist._early_stop = args.early_stop
+        if args.save_values is not None:
+            self.nist._save_values = args.save_values
+        if args.reduce_in_workers is not None:
+            self.nist._reduce_in_workers = args.reduce_in_workers
+        if args.checkpoint_interval is not None:
+            self.nist._checkpoint_interval = args.checkpoint_interval
         if args.nist_p:
             self.nist._p = args.nist_p
         # Statistical analysis
@@ -527,6 +803,8 @@ class Config:
             self.stat._n_iterations = args.stat_n_iterations
         if args.stat_p is not None:
             self.stat._p = args.stat_p
+        if args.stat_parallel_iterations is not None:
+            self.stat._parallel_iterations = args.stat_parallel_iterations
 
     def _validate(self) -> None:
         """Validate parameters.
@@ -559,6 +837,43 @@ class Config:
         if not isinstance(self._parallel, bool):
             raise ValueError(f'Invalid configuration parameter: "parallel" ({self._parallel})')
 
+        if self._executor not in permutation_tests.EXECUTORS:
+            raise ValueError(f'Invalid configuration parameter: "executor" ({self._executor})')
+
+        if (not isinstance(self._workers, int)) or (self._workers < 0):
+            raise ValueError(f'Invalid configuration parameter: "workers" ({self._workers})')
+
+        if self._start_method is not None and self._start_method not in permutation_tests.START_METHODS:
+            raise ValueError(f'Invalid configuration parameter: "start_method" ({self._start_method})')
+
+        if not isinstance(self._pin_workers, bool):
+            raise ValueError(f'Invalid configuration parameter: "pin_workers" ({self._pin_workers})')
+
+        if self._backend not in permutation_tests.BACKENDS:
+            raise ValueError(f'Invalid configuration parameter: "backend" ({self._backend})')
+
+        if (not isinstance(self._batch_size, int)) or (self._batch_size < 1):
+            raise ValueError(f'Invalid configuration parameter: "batch_size" ({self._batch_size})')
+
+        if self._batch_size > 1 and self._backend != permutation_tests.BACKEND_NUMPY:
+            raise ValueError(f'"batch_size" > 1 requires the {permutation_tests.BACKEND_NUMPY} backend')
+
+        if (not isinstance(self._chunk_size, int)) or (self._chunk_size < 0):
+            raise ValueError(f'Invalid configuration parameter: "chunk_size" ({self._chunk_size})')
+
+        if self._resume is not None:
+            if not os.path.isfile(os.path.join(self._resume, self.RESULTS_CONFIG_FILE)):
+                raise ValueError(f'Invalid configuration parameter: "resume" ({self._resume})')
+            # Resume with the seed of the interrupted run, unless provided
+            if self._seed is None:
+                with open(os.path.join(self._resume, self.RESULTS_CONFIG_FILE), encoding="utf-8") as f:
+                    self._seed = json.load(f).get("seed")
+
+        if self._seed is None:
+            self._seed = permutation_tests.new_seed()
+        elif (not isinstance(self._seed, int)) or (self._seed < 0):
+            raise ValueError(f'Invalid configuration parameter: "seed" ({self._seed})')
+
         if not isinstance(self._debug, bool):
             raise ValueError(f'Invalid configuration parameter: "debug" ({self._debug})')
 
@@ -592,6 +907,23 @@ class Config:
         if not isinstance(self.nist._plot, bool):
             raise ValueError(f'Invalid configuration parameter: "plot" ({self.nist._plot})')
 
+        if not isinstance(self.nist._early_stop, bool):
+            raise ValueError(f'Invalid configuration parameter: "early_stop" ({self.nist._early_stop})')
+
+        if not isinstance(self.nist._save_values, bool):
+            raise ValueError(f'Invalid configuration parameter: "save_values" ({self.nist._save_values})')
+
+        if not isinstance(self.nist._reduce_in_workers, bool):
+            raise ValueError(f'Invalid configuration parameter: "reduce_in_workers" ({self.nist._reduce_in_workers})')
+
+        if self.nist._reduce_in_workers and (self.nist._save_values or self.nist._early_stop):
+            raise ValueError('"reduce_in_workers" requires "save_values" and "early_stop" to be disabled')
+
+        if (not isinstance(self.nist._checkpoint_interval, int)) or (self.nist._checkpoint_interval < 0):
+            raise ValueError(
+                f'Invalid configuration parameter: "checkpoint_interval" ({self.nist._checkpoint_interval})'
+            )
+
         if (
             (not self.nist._p)
             or (not isinstance(self.nist._p, list))
@@ -602,6 +934,12 @@ class Config:
         if (any(i <= 0 for i in self.nist._p)) or (any(i >= self.nist.n_symbols for i in self.nist._p)):
             raise ValueError(f'Parameter out of range (0 < nist_p < nist_n_symbols): "nist_p" ({self.nist._p})')
 
+        if any(i > self.nist.MAX_P for i in self.nist._p):
+            raise ValueError(f'Parameter out of range (nist_p <= {self.nist.MAX_P}): "nist_p" ({self.nist._p})')
+
+        if len(set(self.nist._p)) != len(self.nist._p):
+            raise ValueError(f'Repeated values in configuration parameter: "nist_p" ({self.nist._p})')
+
         # Statistical analysis
         if (
             (not isinstance(self.stat._selected_tests, list))
@@ -635,6 +973,11 @@ class Config:
         if (self.stat._p <= 0) or (self.stat._p >= self.stat.n_symbols):
             raise ValueError(f'Parameter out of range (0 < stat_p < stat_n_symbols): "stat_p" ({self.stat._p})')
 
+        if not isinstance(self.stat._parallel_iterations, bool):
+            raise ValueError(
+                f'Invalid configuration parameter: "stat_parallel_iterations" ({self.stat._parallel_iterations})'
+            )
+
     @property
     def nist(self) -> NISTConfig:
         return self._nist
@@ -675,6 +1018,43 @@ class Config:
     def parallel(self) -> bool:
         return self._parallel
 
+    @property
+    def executor(self) -> str:
+        # Disabling parallel mode selects the serial executor
+        return self._executor if self._parallel else permutation_tests.EXECUTOR_SERIAL
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def start_method(self) -> str | None:
+        return self._start_method
+
+    @property
+    def pin_workers(self) -> bool:
+        return self._pin_workers
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    @property
+    def seed(self) -> int | None:
+        return self._seed
+
+    @property
+    def resume(self) -> str | None:
+        return self._resume
+
     @property
     def debug(self) -> bool:
         return self._debug
@@ -689,6 +1069,15 @@ class Config:
         data["statistical_analysis"] = self.statistical_analysis
         data["min_entropy"] = self.min_entropy
         data["parallel"] = self.parallel
+        data["executor"] = self.executor
+        data["workers"] = self.workers
+        data["start_method"] = self.start_method
+        data["pin_workers"] = self.pin_workers
+        data["backend"] = self.backend
+        data["batch_size"] = self.batch_size
+        data["chunk_size"] = self.chunk_size
+        data["seed"] = self.seed
+        data["resume"] = self.resume
         if self.nist_test:
             data["nist"] = collections.OrderedDict()
             data["nist"]["selected_tests"] = self.nist.selected_tests
@@ -696,6 +1085,10 @@ class Config:
             data["nist"]["n_permutations"] = self.nist.n_permutations
             data["nist"]["first_seq"] = self.nist.first_seq
             data["nist"]["plot"] = self.nist.plot
+            data["nist"]["early_stop"] = self.nist.early_stop
+            data["nist"]["save_values"] = self.nist.save_values
+            data["nist"]["reduce_in_workers"] = self.nist.reduce_in_workers
+            data["nist"]["checkpoint_interval"] = self.nist.checkpoint_interval
             data["nist"]["p"] = self.nist.p
         if self.statistical_analysis:
             data["stat"] = collections.OrderedDict()
@@ -704,6 +1097,7 @@ class Config:
             data["stat"]["n_permutations"] = self.stat.n_permutations
             data["stat"]["n_iterations"] = self.stat.n_iterations
             data["stat"]["p"] = self.stat.p
+            data["stat"]["parallel_iterations"] = self.stat.parallel_iterations
         return json.dumps(data, ensure_ascii=False, indent=4)
 
     def to_json_file(self, file) -> None:
@@ -725,6 +1119,7 @@ class Config:
 n_permutations: {self.nist.n_permutations}
 selected tests ({selected_tests_all}): {selected_tests}
 reference sequence read from {"beginning" if self.nist.first_seq else "end"} of the file
+early termination: {"enabled" if self.nist.early_stop else "disabled"}
 p parameter ({"NIST" if self.nist.p == self.nist.DEFAULT_P else "custom"}): {self.nist.p}"""
         else:
             nist_str = "NIST test disabled"
@@ -736,7 +1131,8 @@ p parameter ({"NIST" if self.nist.p == self.nist.DEFAULT_P else "custom"}): {sel
 n_permutations: {self.stat.n_permutations}
 n_iterations: {self.stat.n_iterations}
 selected tests ({selected_tests_all}): {selected_tests}
-p parameter ({"default" if self.stat.p == self.stat.DEFAULT_P else "custom"}): {self.stat.p}"""
+p parameter ({"default" if self.stat.p == self.stat.DEFAULT_P else "custom"}): {self.stat.p}
+parallel iterations: {"enabled" if self.stat.parallel_iterations else "disabled"}"""
         else:
             stat_str = "Statistical analysis disabled"
 
@@ -746,6 +1142,7 @@ p parameter ({"default" if self.stat.p == self.stat.DEFAULT_P else "custom"}): {
 Config file{" (invalid)" if self.config_file and not self.config_file_read else ""}: {self.config_file}
 Input file ({os.path.getsize(self.input_file)}B): {self.input_file}
 Input file digest ({Config.DEFAULT_HASH_ALGORITHM}): {self.input_file_digest}
+Random seed: {self.seed}
 
 NIST test parameters:
 {nist_str}
@@ -0,0 +1,96 @@
+import logging
+import math
+import os
+import pathlib
+
+# Configure per-module logger
+logger = logging.getLogger(f"IID_validation.{pathlib.Path(__file__).stem}")
+
+# Mount table and control groups of the current process
+MOUNTINFO_FILE = "/proc/self/mountinfo"
+CGROUP_FILE = "/proc/self/cgroup"
+
+
+def affinity_cpus() -> list[int]:
+    """Returns the CPUs the current process is allowed to run on.
+
+    Returns
+    -------
+    list of int
+        indexes of the CPUs in the affinity mask of the process, all the CPUs of the system if the platform has no
+        affinity masks
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _cgroup2_directory() -> tuple[pathlib.Path, pathlib.Path] | None:
+    """Returns the mount point of the cgroup v2 hierarchy and the directory of the cgroup of the current process in it,
+    None if they are not found."""
+    try:
+        with open(MOUNTINFO_FILE) as f:
+            # Fields: mount ID, parent ID, major:minor, root, mount point, options..., "-", filesystem type, ...
+            mounts = [line.split() for line in f]
+        with open(CGROUP_FILE) as f:
+            # The cgroup v2 entry has hierarchy ID 0 and no controller list, e.g. "0::/user.slice"
+            paths = [line.rstrip("\n").split(":", 2)[2] for line in f if line.startswith("0::")]
+    except OSError:
+        return None
+    cgroup2_mounts = [m for m in mounts if "-" in m and m[m.index("-") + 1] == "cgroup2"]
+    if not cgroup2_mounts or not paths:
+        return None
+    # The mounted hierarchy starts at the root of the mount, e.g. the cgroup of a container
+    root, mount_point = pathlib.PurePosixPath(cgroup2_mounts[0][3]), pathlib.Path(cgroup2_mounts[0][4])
+    path = pathlib.PurePosixPath(paths[0])
+    if not path.is_relative_to(root):
+        return None
+    return mount_point, mount_point / path.relative_to(root)
+
+
+def cgroup_cpu_quota() -> float | None:
+    """Returns the CPU quota of the current process in the cgroup v2 hierarchy.
+
+    The quota of a cgroup is read from its cpu.max file, "$MAX $PERIOD" or "max $PERIOD" if unlimited, and the quota of
+    the process is the smallest quota of its cgroup and of the ancestors within the mounted hierarchy.
+
+    Returns
+    -------
+    float | None
+        the number of CPUs worth of time the process can use, None if it is not limited
+    """
+    cgroup2 = _cgroup2_directory()
+    if cgroup2 is None:
+        return None
+    mount_point, directory = cgroup2
+    quota = None
+    for d in (directory, *directory.parents):
+        if not d.is_relative_to(mount_point):
+            break
+        try:
+            limit, period = (d / "cpu.max").read_text().split()
+        except (OSError, ValueError):
+            continue
+        if limit != "max":
+            quota = min(quota or math.inf, int(limit) / int(period))
+    return quota
+
+
+def available_cpus() -> int:
+    """Returns the number of CPUs available to the current process.
+
+    os.cpu_count() counts the CPUs of the host, which a container may only be allowed a fraction of: the count is
+    limited to the CPUs of the affinity mask of the process, and to its cgroup v2 CPU quota rounded up, so that a pool
+    with one worker per available CPU is not throttled.
+
+    Returns
+    -------
+    int
+        number of available CPUs, at least 1
+    """
+    n_cpus = len(affinity_cpus())
+    quota = cgroup_cpu_quota()
+    if quota is not None and math.ceil(quota) < n_cpus:
+        logger.debug("CPU quota of %s CPUs out of %s CPUs", quota, n_cpus)
+        n_cpus = math.ceil(quota)
+    return max(1, n_cpus)
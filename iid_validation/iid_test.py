@@ -1,53 +1,108 @@
+import contextlib
 import logging
 import os
 import pathlib
 import time
 
-import numpy as np
-
 from . import config, permutation_tests, plot, read, save
 
 # Configure per-module logger
 logger = logging.getLogger(f"IID_validation.{pathlib.Path(__file__).stem}")
 
+# Checkpoint of the permutations of an interrupted run, removed once the run is complete
+CHECKPOINT_FILE = "checkpoint.json"
+
 
-def iid_plots(conf: config.Config, Tx: list[float], Ti: list[list[float]]) -> None:
+def iid_plots(conf: config.Config, accumulator: permutation_tests.TestAccumulator) -> None:
     """Plots a histogram of Ti values with respect to the Tx test value.
 
     Parameters
     ----------
     conf : config.Config
         application configuration parameters
-    Tx : list of float
-        reference test values
-    Ti : list of list of float
-        test values calculated on shuffled sequences
+    accumulator : permutation_tests.TestAccumulator
+        reference test values and accumulated test values calculated on shuffled sequences
     """
     histo_dir = "histogram_TxTi"
     # Ensure the directory exists
     os.makedirs(histo_dir, exist_ok=True)
 
-    Ti_transposed = np.transpose(Ti)
-    test_names = save.TestResults.test_labels(conf.nist.selected_tests, conf.nist.p)
-    test_types = save.TestResults.test_isint(conf.nist.selected_tests, conf.nist.p)
-    for t in range(len(Tx)):
-        plot.histogram_TxTi(Tx[t], Ti_transposed[t], test_names[t], test_types[t], histo_dir)
+    if accumulator.n == 0:
+        logger.warning("No permutations computed, the Tx-Ti plots are skipped")
+        return
+    # The standard deviation is not defined for a single permutation, e.g. with an early stop
+    Ti_stdev = accumulator.stdev() if accumulator.n >= 2 else [None] * len(accumulator.Tx)
+    plan = permutation_tests.plan_tests(conf.nist.selected_tests, conf.nist.p)
+    for t in range(len(accumulator.Tx)):
+        plot.histogram_TxTi(
+            accumulator.Tx[t],
+            accumulator.histograms[t],
+            accumulator.mean[t],
+            Ti_stdev[t],
+            plan.labels[t],
+            plan.result_types[t] is int,
+            histo_dir,
+        )
+
+
+def checkpoint_run(conf: config.Config) -> dict:
+    """Returns the parameters that determine the test values of the permutations, which a checkpoint must match to be
+    resumed.
 
+    Parameters
+    ----------
+    conf : config.Config
+        application configuration parameters
 
-def iid_test_function(conf: config.Config) -> None:
+    Returns
+    -------
+    dict
+        the parameters of the run
+    """
+    return {
+        "input_file_digest": conf.input_file_digest,
+        "n_symbols": conf.nist.n_symbols,
+        "first_seq": conf.nist.first_seq,
+        "n_permutations": conf.nist.n_permutations,
+        "selected_tests": conf.nist.selected_tests,
+        "p": conf.nist.p,
+        "save_values": conf.nist.save_values,
+        "backend": conf.backend,
+        "seed": conf.seed,
+    }
+
+
+def iid_test_function(conf: config.Config, pool: permutation_tests.WorkerPool | None = None) -> None:
     """Performs the IID validation procedure.
 
     Parameters
     ----------
     conf : config.Config
         application configuration parameters
+    pool : permutation_tests.WorkerPool | None
+        the pool running the permutations, a new pool for the test if None
     """
     logger.debug("IID validation started")
+    checkpoint = None
+    if conf.resume:
+        if os.path.isfile(CHECKPOINT_FILE):
+            checkpoint = save.load_checkpoint(CHECKPOINT_FILE)
+            if checkpoint["run"] != checkpoint_run(conf):
+                raise ValueError(f"The checkpoint ({CHECKPOINT_FILE}) does not match the configuration of the run")
+            # Counters of the interrupted run, if any, are saved again once it is complete
+            if os.path.isfile("counter_values.csv"):
+                os.remove("counter_values.csv")
+        elif os.path.isfile("counter_values.csv"):
+            logger.info("IID validation already completed, nothing to resume")
+            return
+
     S = read.read_file(conf.input_file, conf.nist.n_symbols, first_seq=conf.nist.first_seq)
     logger.debug("Read a sequence of %s symbols from file (%s) ", conf.nist.n_symbols, conf.input_file)
 
+    profile = permutation_tests.sequence_profile(S)
+
     logger.debug("Calculating the selected test reference statistics (Tx) on the input sequence")
-    Tx = permutation_tests.run_tests(S, conf.nist.p, conf.nist.selected_tests)
+    Tx = permutation_tests.run_tests(S, conf.nist.p, conf.nist.selected_tests, conf.backend, profile)
     logger.debug("Reference statistics calculated!")
 
     logger.debug(
@@ -55,16 +110,77 @@ def iid_test_function(conf: config.Config) -> None:
         conf.nist.n_permutations,
     )
     t0 = time.process_time()
-    Ti = permutation_tests.run_tests_permutations(
-        S, conf.nist.n_permutations, conf.nist.selected_tests, conf.nist.p, conf.parallel
-    )
-    ti = time.process_time() - t0
+    # Process time spent before resuming the run
+    t_resumed = checkpoint["process_time"] if checkpoint else 0.0
+    len_Ti = checkpoint["accumulator"]["n"] if checkpoint else 0
+    # The test values are streamed to file, if enabled, while the counters are accumulated
+    with (
+        save.TestResults.BinaryFileWriter("test_values.bin", conf.nist.selected_tests, Tx, conf.nist.p, len_Ti)
+        if conf.nist.save_values
+        else contextlib.nullcontext()
+    ) as writer:
+        accumulator = permutation_tests.TestAccumulator(
+            Tx, conf.nist.n_permutations, conf.nist.early_stop, writer.write if writer else None
+        )
+        if checkpoint:
+            accumulator.restore(checkpoint["accumulator"])
+            logger.info("Resuming the IID validation after %s permutations", accumulator.n)
+
+        def save_checkpoint(accumulator: permutation_tests.TestAccumulator) -> None:
+            if writer:
+                writer.flush()
+            save.save_checkpoint(
+                CHECKPOINT_FILE,
+                {
+                    "run": checkpoint_run(conf),
+                    "process_time": t_resumed + time.process_time() - t0,
+                    "accumulator": accumulator.state(),
+                },
+            )
+            logger.debug("Checkpoint saved after %s permutations", accumulator.n)
+
+        try:
+            permutation_tests.accumulate_tests_permutations(
+                S,
+                accumulator,
+                conf.nist.selected_tests,
+                conf.nist.p,
+                conf.executor,
+                conf.workers,
+                backend=conf.backend,
+                batch_size=conf.batch_size,
+                chunk_size=conf.chunk_size,
+                seed=conf.seed,
+                stream=(permutation_tests.STREAM_NIST,),
+                checkpoint=save_checkpoint,
+                checkpoint_interval=conf.nist.checkpoint_interval,
+                profile=profile,
+                pool=pool,
+                reduce=conf.nist.reduce_in_workers,
+            )
+        except KeyboardInterrupt:
+            # The partial results are kept: the checkpoint marks them as incomplete and lets the run be resumed
+            with permutation_tests.deferred_interrupts():
+                save_checkpoint(accumulator)
+                save.save_counters(
+                    conf.nist.n_symbols,
+                    accumulator.n,
+                    conf.nist.selected_tests,
+                    accumulator.C0,
+                    accumulator.C1,
+                    accumulator.result,
+                    t_resumed + time.process_time() - t0,
+                )
+            logger.warning(
+                "IID validation interrupted after %s of %s permutations, partial results saved",
+                accumulator.n,
+                conf.nist.n_permutations,
+            )
+            raise
+    ti = t_resumed + time.process_time() - t0
     logger.debug("Calculated the test statistic (Ti) on each shuffled sequence!")
 
-    save.TestResults.to_binary_file("test_values.bin", conf.nist.selected_tests, Tx, Ti, conf.nist.p)
-
-    logger.debug("Calculating the counters, C0 and C1")
-    C0, C1 = permutation_tests.calculate_counters(Tx, Ti)
+    C0, C1 = accumulator.C0, accumulator.C1
     logger.debug("C0 = %s", C0)
     logger.debug("C1 = %s", C1)
 
@@ -72,10 +188,10 @@ def iid_test_function(conf: config.Config) -> None:
     IID_assumption = permutation_tests.iid_result(C0, C1, conf.nist.n_permutations)
 
     logger.info("IID assumption %s\n", "validated" if IID_assumption else "rejected")
-    # save results of the IID validation
+    # save results of the IID validation, with the number of permutations actually computed
     save.save_counters(
         conf.nist.n_symbols,
-        conf.nist.n_permutations,
+        accumulator.n,
         conf.nist.selected_tests,
         C0,
         C1,
@@ -86,5 +202,8 @@ def iid_test_function(conf: config.Config) -> None:
     # plots
     if conf.nist.plot:
         logger.debug("Saving the Tx-Ti plots")
-        iid_plots(conf, Tx, Ti)
+        iid_plots(conf, accumulator)
         logger.debug("Tx-Ti plots saved!\n")
+
+    if os.path.isfile(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
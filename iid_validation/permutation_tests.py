@@ -1,40 +1,191 @@
 import bz2
 import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import pathlib
 import random
+import secrets
+import signal
 import statistics
+import threading
+import time
 import typing
+from multiprocessing import shared_memory
 
+import numpy as np
 from tqdm import tqdm
 
+from . import cpu, permutation_tests_numba, permutation_tests_numpy
 
-def FY_shuffle(S: list[int]) -> list[int]:
+# Configure per-module logger
+logger = logging.getLogger(f"IID_validation.{pathlib.Path(__file__).stem}")
+
+# Available implementations of the test statistics
+BACKEND_PYTHON = "python"
+BACKEND_NUMPY = "numpy"
+BACKEND_NUMBA = "numba"
+BACKENDS = (BACKEND_PYTHON, BACKEND_NUMPY, BACKEND_NUMBA)
+
+# Executors of the permutations, see run_tests_permutations()
+EXECUTOR_SERIAL = "serial"
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+EXECUTORS = (EXECUTOR_SERIAL, EXECUTOR_THREAD, EXECUTOR_PROCESS)
+
+# Start methods of the worker processes available on the platform, see WorkerPool
+START_METHODS = tuple(multiprocessing.get_all_start_methods())
+
+# Signals interrupting a run, see deferred_interrupts()
+INTERRUPT_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+# Number of tasks assigned to each worker when the chunk size is chosen automatically
+CHUNKS_PER_WORKER = 16
+
+# Roots of the random streams used to shuffle the sequences, see permutation_seed_sequence()
+STREAM_NIST = 0
+STREAM_STAT = 1
+STREAM_STAT_TJNORM = 2
+
+# Number of bins of the histograms of the test values, see Histogram
+HISTOGRAM_BINS = 64
+# Width of the finest bins of the histograms, a power of two so that the integers fall in whole bins of the coarser ones
+HISTOGRAM_RESOLUTION = 2.0**-16
+# Index of the finest bin starting at 0, which puts the edges of the bins of width 1 at half the integers
+_HISTOGRAM_OFFSET = 2**15
+
+
+def resolve_backend(backend: str) -> str:
+    """Returns the backend that implements the test statistics in place of a requested one.
+
+    The numba backend requires the optional numba package: if it is not installed, the numpy backend is used instead,
+    which shuffles the sequences in the same way and returns identical results.
+
+    Parameters
+    ----------
+    backend : str
+        the requested backend, one of BACKENDS
+
+    Returns
+    -------
+    str
+        the backend to use
+    """
+    if backend == BACKEND_NUMBA and not permutation_tests_numba.AVAILABLE:
+        logger.warning("The %s backend requires numba, falling back to the %s backend", BACKEND_NUMBA, BACKEND_NUMPY)
+        return BACKEND_NUMPY
+    return backend
+
+
+def new_seed() -> int:
+    """Draws a random seed from the operating system entropy source.
+
+    The seed fits in a signed 64-bit integer, so that it can be written in the TOML configuration file.
+
+    Returns
+    -------
+    int
+        a non-negative random seed
+    """
+    return secrets.randbits(63)
+
+
+def permutation_seed_sequence(seed: int, stream: tuple[int, ...], index: int) -> np.random.SeedSequence:
+    """Returns the seed sequence of the random stream used to generate a permutation.
+
+    The streams form a SeedSequence spawn tree rooted at seed: each permutation is identified by the key of its stream
+    (e.g. (STREAM_STAT, iteration)) and by its index in the stream. A permutation can therefore be recomputed on demand,
+    and its value does not depend on how the permutations are split among worker processes, chunks and batches.
+
+    Parameters
+    ----------
+    seed : int
+        the seed of the run
+    stream : tuple of int
+        the key of the stream
+    index : int
+        the index of the permutation in the stream
+
+    Returns
+    -------
+    np.random.SeedSequence
+        the seed sequence of the permutation
+    """
+    return np.random.SeedSequence(seed, spawn_key=(*stream, index))
+
+
+SequenceProfile = typing.NamedTuple("SequenceProfile", [("mean", float), ("median", float), ("counts", list[int])])
+
+
+def sequence_profile(S: list[int] | np.ndarray) -> SequenceProfile:
+    """Computes the quantities of a sequence that do not depend on the order of its symbols.
+
+    The profile of the reference sequence holds for all its permutations, so it is computed once per run instead of
+    once per shuffled sequence. The mean and the median are derived from the symbol counts, without sorting: the mean is
+    correctly rounded as in statistics.mean(), and the median equals statistics.median().
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    SequenceProfile
+        mean, median and number of occurrences of each symbol of the sequence
+    """
+    S = permutation_tests_numpy.as_array(S)
+    if len(S) == 0:
+        raise Exception("Input sequence has length 0")
+
+    counts = np.bincount(S).tolist()
+    n = len(S)
+    mean = sum(x * c for x, c in enumerate(counts)) / n
+    # Symbols at the two central positions of the sorted sequence
+    cumulative = np.cumsum(counts)
+    low, high = np.searchsorted(cumulative, [(n - 1) // 2, n // 2], side="right").tolist()
+    return SequenceProfile(mean, (low + high) / 2, counts)
+
+
+def FY_shuffle(S: list[int], rng: random.Random | None = None) -> list[int]:
     """Generates a shuffled sequence using the Fisher-Yates algorithm.
 
     Parameters
     ----------
     S : list of int
         sequence of sample values
+    rng : random.Random | None
+        the random generator to use, the global one of the random module if None
 
     Returns
     -------
     list of int
         shuffled sequence
     """
+    randint = random.randint if rng is None else rng.randint
     for i in range(len(S) - 1, 0, -1):
-        j = random.randint(0, i)
+        j = randint(0, i)
         S[i], S[j] = S[j], S[i]
     return S
 
 
-def s_prime(S: list[int]) -> list[int]:
+def s_prime(S: list[int], out: list[int] | None = None) -> list[int]:
     """Generates a transformed sequence based on the comparison of consecutive elements in the input sequence.
     For each pair of consecutive elements, if the first element is greater than the second, a -1
     is appended to the new sequence; otherwise, a +1 is appended.
 
+    Writes the transformed sequence into out, if provided.
+
     Parameters
     ----------
     S : list of int
         sequence of sample values
+    out : list of int | None
+        a list of len(S) - 1 elements to reuse for the transformed sequence
 
     Returns
     -------
@@ -46,7 +197,7 @@ def s_prime(S: list[int]) -> list[int]:
     if len(S) == 1:
         raise Exception("Input sequence has length 1")
 
-    S_prime = [0] * (len(S) - 1)
+    S_prime = [0] * (len(S) - 1) if out is None else out
     for i in range(len(S) - 1):
         if S[i] > S[i + 1]:
             S_prime[i] = -1
@@ -56,11 +207,11 @@ def s_prime(S: list[int]) -> list[int]:
     return S_prime
 
 
-def s_prime_median(S: list[int], M: float | None = None) -> list[int]:
+def s_prime_median(S: list[int], M: float | None = None, out: list[int] | None = None) -> list[int]:
     """Generates a transformed sequence where each original value is replaced with -1 if it is less than the median of
     the original sequence, or 1 if it is greater than or equal to the median.
 
-    Accepts a pre-computed median value, if provided.
+    Accepts a pre-computed median value, if provided, and writes the transformed sequence into out, if provided.
 
     Parameters
     ----------
@@ -68,6 +219,8 @@ def s_prime_median(S: list[int], M: float | None = None) -> list[int]:
         sequence of sample values
     M: float
         the pre-computed median of the sequence
+    out : list of int | None
+        a list of len(S) elements to reuse for the transformed sequence
 
     Returns
     -------
@@ -80,7 +233,7 @@ def s_prime_median(S: list[int], M: float | None = None) -> list[int]:
     if M is None:
         M = statistics.median(S)
 
-    S_prime = [0] * (len(S))
+    S_prime = [0] * (len(S)) if out is None else out
     for i in range(len(S)):
         if S[i] < M:
             S_prime[i] = -1
@@ -89,13 +242,18 @@ def s_prime_median(S: list[int], M: float | None = None) -> list[int]:
     return S_prime
 
 
-def compute_collisions(S: list[int]) -> list[int]:
+def compute_collisions(S: list[int], out: list[int] | None = None) -> list[int]:
     """Counts the number of successive sample values until a duplicate is found.
 
+    Writes the counts into out, if provided, which is resized to the number of collisions: a list reused for sequences
+    of the same length is only resized by the small difference in their numbers of collisions.
+
     Parameters
     ----------
     S : list[int]
         sequence of sample values
+    out : list[int] | None
+        a list to reuse for the counts
 
     Returns
     -------
@@ -103,15 +261,21 @@ def compute_collisions(S: list[int]) -> list[int]:
         list of the numbers of samples observed to find a duplicate in the input sequence
     """
     seen = set()
-    C = []
+    C = [] if out is None else out
+    n_collisions = 0
     last_split = 0
     for i, x in enumerate(S, 1):
         if x in seen:
-            C.append(i - last_split)
+            if n_collisions < len(C):
+                C[n_collisions] = i - last_split
+            else:
+                C.append(i - last_split)
+            n_collisions += 1
             last_split = i
             seen.clear()
         else:
             seen.add(x)
+    del C[n_collisions:]
     return C
 
 
@@ -189,9 +353,9 @@ def _excursion(S: list[int], X: float | None = None) -> float:
     if X is None:
         X = statistics.mean(S)
 
+    # The deviations are reduced as they are generated, without a list of len(S) floats
     cumulative_sum = 0
-    D = [abs((cumulative_sum := cumulative_sum + element) - (i * X)) for i, element in enumerate(S, 1)]  # noqa: F841
-    return max(D)
+    return max(abs((cumulative_sum := cumulative_sum + element) - (i * X)) for i, element in enumerate(S, 1))
 
 
 def _n_directional_runs(S: list[int], S_prime: list[int] | None = None) -> int:
@@ -330,6 +494,8 @@ def _avg_collision(S: list[int], C: list[int] | None = None) -> float:
     """
     if C is None:
         C = compute_collisions(S)
+    if not C:
+        raise ValueError("No collision found in the input sequence")
     return statistics.mean(C)
 
 
@@ -352,6 +518,8 @@ def _max_collision(S: list[int], C: list[int] | None = None) -> int:
     """
     if C is None:
         C = compute_collisions(S)
+    if not C:
+        raise ValueError("No collision found in the input sequence")
     return max(C)
 
 
@@ -420,21 +588,159 @@ def _compression(S: list[int]) -> int:
     return len(t)
 
 
-_Test = typing.NamedTuple("Test", [("id", int), ("name", str), ("pretty_name", str), ("run", typing.Callable)])
+# A test statistic of the registry, with one implementation per backend. result_type is the type of its results, int
+# or float, which determines their binary encoding and their plots. A test per_lag is run once for each p value, with
+# the lag as second argument, except for its NumPy implementation, which runs all the lags at once with run_numpy_lags.
+# Any other test takes as other arguments the intermediates it names, which are either fields of the SequenceProfile of
+# the sequence or shared intermediates (see intermediates).
+_Test = typing.NamedTuple(
+    "Test",
+    [
+        ("id", int),
+        ("name", str),
+        ("pretty_name", str),
+        ("run", typing.Callable),
+        ("run_numpy", typing.Callable),
+        ("run_numba", typing.Callable),
+        ("result_type", type),
+        ("per_lag", bool),
+        ("run_numpy_lags", typing.Callable | None),
+        ("intermediates", tuple[str, ...]),
+    ],
+)
 
-excursion = _Test(0, "excursion", "5.1.1 Excursion Test Statistic", _excursion)
-n_directional_runs = _Test(1, "n_directional_runs", "5.1.2 Number of Directional Runs", _n_directional_runs)
-l_directional_runs = _Test(2, "l_directional_runs", "5.1.3 Length of Directional Runs", _l_directional_runs)
+excursion = _Test(
+    0,
+    "excursion",
+    "5.1.1 Excursion Test Statistic",
+    _excursion,
+    permutation_tests_numpy._excursion,
+    permutation_tests_numba._excursion,
+    result_type=float,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("mean",),
+)
+n_directional_runs = _Test(
+    1,
+    "n_directional_runs",
+    "5.1.2 Number of Directional Runs",
+    _n_directional_runs,
+    permutation_tests_numpy._n_directional_runs,
+    permutation_tests_numba._n_directional_runs,
+    result_type=int,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("S_prime",),
+)
+l_directional_runs = _Test(
+    2,
+    "l_directional_runs",
+    "5.1.3 Length of Directional Runs",
+    _l_directional_runs,
+    permutation_tests_numpy._l_directional_runs,
+    permutation_tests_numba._l_directional_runs,
+    result_type=int,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("S_prime",),
+)
 n_increases_decreases = _Test(
-    3, "n_increases_decreases", "5.1.4 Number of Increases and Decreases", _n_increases_decreases
+    3,
+    "n_increases_decreases",
+    "5.1.4 Number of Increases and Decreases",
+    _n_increases_decreases,
+    permutation_tests_numpy._n_increases_decreases,
+    permutation_tests_numba._n_increases_decreases,
+    result_type=int,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("S_prime",),
+)
+n_median_runs = _Test(
+    4,
+    "n_median_runs",
+    "5.1.5 Number of Runs Based on the Median",
+    _n_median_runs,
+    permutation_tests_numpy._n_median_runs,
+    permutation_tests_numba._n_median_runs,
+    result_type=int,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("S_prime_median",),
+)
+l_median_runs = _Test(
+    5,
+    "l_median_runs",
+    "5.1.6 Length of Runs Based on Median",
+    _l_median_runs,
+    permutation_tests_numpy._l_median_runs,
+    permutation_tests_numba._l_median_runs,
+    result_type=int,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("S_prime_median",),
+)
+avg_collision = _Test(
+    6,
+    "avg_collision",
+    "5.1.7 Average Collision Test Statistic",
+    _avg_collision,
+    permutation_tests_numpy._avg_collision,
+    permutation_tests_numba._avg_collision,
+    result_type=float,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("collisions",),
+)
+max_collision = _Test(
+    7,
+    "max_collision",
+    "5.1.8 Maximum Collision Test Statistic",
+    _max_collision,
+    permutation_tests_numpy._max_collision,
+    permutation_tests_numba._max_collision,
+    result_type=int,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=("collisions",),
+)
+periodicity = _Test(
+    8,
+    "periodicity",
+    "5.1.9 Periodicity Test Statistic",
+    _periodicity,
+    permutation_tests_numpy._periodicity,
+    permutation_tests_numba._periodicity,
+    result_type=int,
+    per_lag=True,
+    run_numpy_lags=permutation_tests_numpy.periodicity_lags,
+    intermediates=(),
+)
+covariance = _Test(
+    9,
+    "covariance",
+    "5.1.10 Covariance Test Statistic",
+    _covariance,
+    permutation_tests_numpy._covariance,
+    permutation_tests_numba._covariance,
+    result_type=int,
+    per_lag=True,
+    run_numpy_lags=permutation_tests_numpy.covariance_lags,
+    intermediates=(),
+)
+compression = _Test(
+    10,
+    "compression",
+    "5.1.11 Compression Test Statistic",
+    _compression,
+    permutation_tests_numpy._compression,
+    permutation_tests_numba._compression,
+    result_type=int,
+    per_lag=False,
+    run_numpy_lags=None,
+    intermediates=(),
 )
-n_median_runs = _Test(4, "n_median_runs", "5.1.5 Number of Runs Based on the Median", _n_median_runs)
-l_median_runs = _Test(5, "l_median_runs", "5.1.6 Length of Runs Based on Median", _l_median_runs)
-avg_collision = _Test(6, "avg_collision", "5.1.7 Average Collision Test Statistic", _avg_collision)
-max_collision = _Test(7, "max_collision", "5.1.8 Maximum Collision Test Statistic", _max_collision)
-periodicity = _Test(8, "periodicity", "5.1.9 Periodicity Test Statistic", _periodicity)
-covariance = _Test(9, "covariance", "5.1.10 Covariance Test Statistic", _covariance)
-compression = _Test(10, "compression", "5.1.11 Compression Test Statistic", _compression)
 tests = [
     excursion,
     n_directional_runs,
@@ -449,14 +755,226 @@ tests = [
     compression,
 ]
 
+# An intermediate sequence shared by several tests. An intermediate derived with a field of the SequenceProfile of the
+# sequence takes it as second argument. The Python implementation writes into the list of the same name of
+# ShuffleBuffers, if any, passed as out.
+_Intermediate = typing.NamedTuple(
+    "Intermediate",
+    [
+        ("name", str),
+        ("compute", typing.Callable),
+        ("compute_numpy", typing.Callable),
+        ("compute_numba", typing.Callable),
+        ("profile_field", str | None),
+    ],
+)
+
+intermediates = [
+    _Intermediate("S_prime", s_prime, permutation_tests_numpy.s_prime, permutation_tests_numba.s_prime, None),
+    _Intermediate(
+        "S_prime_median",
+        s_prime_median,
+        permutation_tests_numpy.s_prime_median,
+        permutation_tests_numba.s_prime_median,
+        "median",
+    ),
+    _Intermediate(
+        "collisions",
+        compute_collisions,
+        permutation_tests_numpy.compute_collisions,
+        permutation_tests_numba.compute_collisions,
+        None,
+    ),
+]
+
+# The tests of a run, see plan_tests()
+TestPlan = typing.NamedTuple(
+    "TestPlan",
+    [
+        ("tests", list[_Test]),
+        ("intermediates", list[_Intermediate]),
+        ("needs_profile", bool),
+        ("labels", list[str]),
+        ("result_types", list[type]),
+    ],
+)
+
+
+def plan_tests(test_list: list[int], p: list[int]) -> TestPlan:
+    """Plans the run of a list of tests from the metadata of the registry.
+
+    The tests run in the order of the registry, whatever the order of test_list, after all the intermediates they need,
+    so that each intermediate is computed once per sequence, or per batch of sequences. The results of the plan are
+    laid out as the test values of a permutation, with one result per lag for the tests per_lag.
+
+    Parameters
+    ----------
+    test_list : list of int
+        list of test indexes to run
+    p : list of int
+        list of p values
+
+    Returns
+    -------
+    TestPlan
+        the tests and the intermediates to compute, whether they need the profile of the sequence, and the label and
+        type of each result
+    """
+    return _plan_tests(tuple(test_list), tuple(p))
+
+
+@functools.lru_cache
+def _plan_tests(test_list: tuple[int, ...], p: tuple[int, ...]) -> TestPlan:
+    """Cached implementation of plan_tests(), which run_tests() calls for each shuffled sequence."""
+    planned = [test for test in tests if test.id in test_list]
+    needed = set(name for test in planned for name in test.intermediates)
+    planned_intermediates = [i for i in intermediates if i.name in needed]
+    needs_profile = bool(
+        needed.intersection(SequenceProfile._fields) or any(i.profile_field for i in planned_intermediates)
+    )
+    labels = []
+    result_types = []
+    for test in planned:
+        if test.per_lag:
+            labels.extend([f"{test.name}{n}" for n in p])
+            result_types.extend([test.result_type] * len(p))
+        else:
+            labels.append(test.name)
+            result_types.append(test.result_type)
+    return TestPlan(planned, planned_intermediates, needs_profile, labels, result_types)
+
+
+# Number of elements copied at once into the list buffer of ShuffleBuffers
+_LIST_COPY_BLOCK = 4096
+
+
+class ShuffleBuffers:
+    """Buffers reused by the shuffled sequences of a reference sequence tested in the same thread.
+
+    Each shuffled sequence is drawn by copying the reference sequence into the same buffer and shuffling the buffer in
+    place with the random stream of the permutation. Reshuffling the previous permutation instead would be as uniform,
+    but the permutation drawn from a stream would then depend on the permutations tested before it in the thread, i.e.
+    on the chunk layout of the run, and recompute_permutation() could no longer reproduce it. The intermediate
+    sequences of the tests are written into preallocated lists as well, named after the intermediates, so that in the
+    steady state testing a shuffled sequence does not allocate memory proportional to the length of the sequence.
+
+    The buffers of each backend are allocated on first use.
+    """
+
+    def __init__(self, S: list[int] | np.ndarray) -> None:
+        """Constructs the buffers of a reference sequence.
+
+        Parameters
+        ----------
+        S : list of int or np.ndarray
+            sequence of sample values
+        """
+        self.S = S
+        self.S_prime: list[int] | None = None
+        self.S_prime_median: list[int] | None = None
+        self.collisions: list[int] | None = None
+        self._S_list: list[int] | None = None
+        self._shuffled_list: list[int] | None = None
+        self._S_array: np.ndarray | None = None
+        self._shuffled_array: np.ndarray | None = None
+        self._shuffled_batch: np.ndarray | None = None
+
+    def shuffled_list(self) -> list[int]:
+        """Returns the list buffer of the Python implementation, filled with the reference sequence.
+
+        Returns
+        -------
+        list of int
+            a copy of the reference sequence, to shuffle in place
+        """
+        if self._shuffled_list is None:
+            self._S_list = self.S.tolist() if isinstance(self.S, np.ndarray) else self.S
+            self._shuffled_list = list(self._S_list)
+            self.S_prime = [0] * max(0, len(self._S_list) - 1)
+            self.S_prime_median = [0] * len(self._S_list)
+            self.collisions = []
+        else:
+            # Copied by blocks, as assigning a whole slice of a list allocates a temporary array of the replaced items
+            for i in range(0, len(self._S_list), _LIST_COPY_BLOCK):
+                self._shuffled_list[i : i + _LIST_COPY_BLOCK] = self._S_list[i : i + _LIST_COPY_BLOCK]
+        return self._shuffled_list
+
+    def shuffled_array(self) -> np.ndarray:
+        """Returns the array buffer of the NumPy implementation, filled with the reference sequence.
+
+        Returns
+        -------
+        np.ndarray
+            a copy of the reference sequence, to shuffle in place
+        """
+        if self._shuffled_array is None:
+            self._S_array = permutation_tests_numpy.as_array(self.S)
+            self._shuffled_array = self._S_array.copy()
+        else:
+            np.copyto(self._shuffled_array, self._S_array)
+        return self._shuffled_array
+
+    def batch(self, n_sequences: int) -> np.ndarray:
+        """Returns the batch buffer of the NumPy implementation, grown to hold at least n_sequences sequences.
+
+        Parameters
+        ----------
+        n_sequences : int
+            number of sequences in the batch
+
+        Returns
+        -------
+        np.ndarray
+            uninitialized 2-D array of shape (n_sequences, len(S))
+        """
+        if self._shuffled_batch is None or len(self._shuffled_batch) < n_sequences:
+            self._shuffled_batch = np.empty((n_sequences, len(self.S)), dtype=np.uint8)
+        return self._shuffled_batch[:n_sequences]
+
+
+# Shuffle buffers of the current thread, see shuffle_buffers()
+_thread_buffers = threading.local()
+
+
+def shuffle_buffers(S: list[int] | np.ndarray) -> ShuffleBuffers:
+    """Returns the shuffle buffers of a sequence in the current thread.
+
+    A worker thread or process keeps the buffers of the last sequence it tested, i.e. of the sequence of the run, and
+    reuses them for all its tasks.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    ShuffleBuffers
+        the buffers of the sequence, replacing those of any other sequence in the current thread
+    """
+    buffers = getattr(_thread_buffers, "buffers", None)
+    if buffers is None or buffers.S is not S:
+        buffers = _thread_buffers.buffers = ShuffleBuffers(S)
+    return buffers
+
 
-def run_tests(S: list[int], p: list[int], test_list: list[int] = [i.id for i in tests]) -> list[float]:
+def run_tests(
+    S: list[int] | np.ndarray,
+    p: list[int],
+    test_list: list[int] = [i.id for i in tests],
+    backend: str = BACKEND_PYTHON,
+    profile: SequenceProfile | None = None,
+    buffers: ShuffleBuffers | None = None,
+) -> list[float]:
     """Runs a list of tests on a specified sequence, using a specified p value.
     By default, all tests are run.
 
+    The permutation-invariant quantities of the sequence are taken from profile, if provided, and computed otherwise.
+    The intermediate sequences of the Python implementation are written into buffers, if provided.
+
     Parameters
     ----------
-    S : list of int
+    S : list of int or np.ndarray
         sequence of sample values
 
     p : list of int
@@ -465,60 +983,154 @@ def run_tests(S: list[int], p: list[int], test_list: list[int] = [i.id for i in
     test_list : list of int
         list of test indexes to run
 
+    backend : str
+        implementation of the test statistics, one of BACKENDS
+
+    profile : SequenceProfile | None
+        the profile of the sequence, or of any of its permutations
+
+    buffers : ShuffleBuffers | None
+        the buffers of the sequence, or of any of its permutations
+
     Returns
     -------
     list of float
         list of tests results
     """
+    plan = plan_tests(test_list, p)
+    if profile is None and plan.needs_profile:
+        profile = sequence_profile(S)
+    if backend == BACKEND_NUMPY:
+        return _run_tests_numpy(permutation_tests_numpy.as_array(S), p, test_list, profile)
+    if backend == BACKEND_NUMBA:
+        return _run_tests_numba(permutation_tests_numpy.as_array(S), p, test_list, profile)
+    if backend != BACKEND_PYTHON:
+        raise ValueError(f"Unsupported backend: {backend}, supported {BACKENDS}")
+    if isinstance(S, np.ndarray):
+        S = S.tolist()
+
+    # Pre-compute common intermediate values
+    values = {} if profile is None else profile._asdict()
+    for intermediate in plan.intermediates:
+        args = [] if intermediate.profile_field is None else [values[intermediate.profile_field]]
+        values[intermediate.name] = intermediate.compute(S, *args, out=getattr(buffers, intermediate.name, None))
+
+    T = []
+    for test in plan.tests:
+        if test.per_lag:
+            T.extend([test.run(S, each_p) for each_p in p])
+        else:
+            T.append(test.run(S, *[values[name] for name in test.intermediates]))
+    return T
+
+
+def _run_tests_numpy(
+    S: np.ndarray, p: list[int], test_list: list[int], profile: SequenceProfile | None = None
+) -> list[float] | np.ndarray:
+    """Runs a list of tests on a specified sequence with the NumPy implementation of the test statistics.
+
+    A 2-D array is tested as a batch of sequences, one per row; the profile, if provided, is shared by all the rows.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values, or batch of sequences
+
+    p : list of int
+        list of p values
+
+    test_list : list of int
+        list of test indexes to run
+
+    profile : SequenceProfile | None
+        the profile of the sequences
+
+    Returns
+    -------
+    list of float or np.ndarray
+        list of tests results, or array of float64 tests results with one row for each sequence in the batch
+    """
+    plan = plan_tests(test_list, p)
+
+    # Pre-compute common intermediate values on the whole batch; without a profile, the NumPy implementation computes
+    # the fields it needs
+    values = dict.fromkeys(SequenceProfile._fields) if profile is None else profile._asdict()
+    for intermediate in plan.intermediates:
+        args = [] if intermediate.profile_field is None else [values[intermediate.profile_field]]
+        values[intermediate.name] = intermediate.compute_numpy(S, *args)
+
     T = []
+    for test in plan.tests:
+        # All the lags are computed at once, with the lags along the last axis
+        if test.per_lag:
+            T.extend(np.moveaxis(test.run_numpy_lags(S, p), -1, 0))
+        else:
+            T.append(test.run_numpy(S, *[values[name] for name in test.intermediates]))
+
+    # Return native Python values for a single sequence, as the pure-Python implementation does
+    if S.ndim == 1:
+        return [t.item() for t in T]
+    return np.stack(T, axis=-1).astype(np.float64, copy=False)
+
+
+def _run_tests_numba(S: np.ndarray, p: list[int], test_list: list[int], profile: SequenceProfile) -> list[float]:
+    """Runs a list of tests on a specified sequence with the JIT-compiled implementation of the test statistics.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    p : list of int
+        list of p values
+
+    test_list : list of int
+        list of test indexes to run
+
+    profile : SequenceProfile
+        the profile of the sequence, if the tests need it
+
+    Returns
+    -------
+    list of float
+        list of tests results
+    """
+    plan = plan_tests(test_list, p)
 
     # Pre-compute common intermediate values
-    S_prime = None
-    if set((n_directional_runs.id, l_directional_runs.id, n_increases_decreases.id)).intersection(test_list):
-        S_prime = s_prime(S)
-    S_prime_median = None
-    if set((n_median_runs.id, l_median_runs.id)).intersection(test_list):
-        S_prime_median = s_prime_median(S)
-    collisions = None
-    if set((avg_collision.id, max_collision.id)).intersection(test_list):
-        collisions = compute_collisions(S)
-
-    if excursion.id in test_list:
-        T.append(excursion.run(S))
-    if n_directional_runs.id in test_list:
-        T.append(n_directional_runs.run(S, S_prime))
-    if l_directional_runs.id in test_list:
-        T.append(l_directional_runs.run(S, S_prime))
-    if n_increases_decreases.id in test_list:
-        T.append(n_increases_decreases.run(S, S_prime))
-    if n_median_runs.id in test_list:
-        T.append(n_median_runs.run(S, S_prime_median))
-    if l_median_runs.id in test_list:
-        T.append(l_median_runs.run(S, S_prime_median))
-    if avg_collision.id in test_list:
-        T.append(avg_collision.run(S, collisions))
-    if max_collision.id in test_list:
-        T.append(max_collision.run(S, collisions))
-    if periodicity.id in test_list:
-        for each_p in p:
-            T.append(periodicity.run(S, each_p))
-    if covariance.id in test_list:
-        for each_p in p:
-            T.append(covariance.run(S, each_p))
-    if compression.id in test_list:
-        T.append(compression.run(S))
+    values = {} if profile is None else profile._asdict()
+    for intermediate in plan.intermediates:
+        args = [] if intermediate.profile_field is None else [values[intermediate.profile_field]]
+        values[intermediate.name] = intermediate.compute_numba(S, *args)
 
+    T = []
+    for test in plan.tests:
+        if test.per_lag:
+            T.extend([test.run_numba(S, each_p) for each_p in p])
+        else:
+            T.append(test.run_numba(S, *[values[name] for name in test.intermediates]))
     return T
 
 
-def run_tests_shuffle(S: list[int], p: list[int], test_list: list[int] = [i.id for i in tests]) -> list[float]:
+def run_tests_shuffle(
+    S: list[int] | np.ndarray,
+    p: list[int],
+    test_list: list[int] = [i.id for i in tests],
+    backend: str = BACKEND_PYTHON,
+    seed_sequence: np.random.SeedSequence | None = None,
+    profile: SequenceProfile | None = None,
+    buffers: ShuffleBuffers | None = None,
+) -> list[float]:
     """Shuffles a given sequence using the Fisher-Yates method, then runs a list of tests on the shuffled sequence,
     using a specified p value.
     By default, all tests are run.
 
+    The shuffle is drawn from the random stream seeded by seed_sequence, if provided. The sequence is shuffled in the
+    buffers of the sequence, if provided, and in a new copy otherwise.
+
     Parameters
     ----------
-    S : list of int
+    S : list of int or np.ndarray
         sequence of sample values
 
     p : list of int
@@ -527,20 +1139,665 @@ def run_tests_shuffle(S: list[int], p: list[int], test_list: list[int] = [i.id f
     test_list : list of int
         list of test indexes to run
 
+    backend : str
+        implementation of the test statistics, one of BACKENDS
+
+    seed_sequence : np.random.SeedSequence | None
+        the seed of the random stream of the shuffle, if any
+
+    profile : SequenceProfile | None
+        the profile of the sequence, computed by run_tests() if None
+
+    buffers : ShuffleBuffers | None
+        the buffers of the sequence, see shuffle_buffers()
+
     Returns
     -------
     list of float
         list of tests results
     """
-    s_shuffled = FY_shuffle(S.copy())
-    return run_tests(s_shuffled, p, test_list)
+    # The JIT-compiled implementation tests the same shuffles as the NumPy one
+    if backend in (BACKEND_NUMPY, BACKEND_NUMBA):
+        rng = None if seed_sequence is None else permutation_tests_numpy.generator(seed_sequence)
+        s_copy = permutation_tests_numpy.as_array(S).copy() if buffers is None else buffers.shuffled_array()
+        s_shuffled = permutation_tests_numpy.FY_shuffle(s_copy, rng)
+    else:
+        rng = (
+            None
+            if seed_sequence is None
+            else random.Random(int.from_bytes(seed_sequence.generate_state(4).tobytes(), "little"))
+        )
+        if buffers is not None:
+            s_copy = buffers.shuffled_list()
+        else:
+            s_copy = S.tolist() if isinstance(S, np.ndarray) else S.copy()
+        s_shuffled = FY_shuffle(s_copy, rng)
+    return run_tests(s_shuffled, p, test_list, backend, profile, buffers)
+
+
+def recompute_permutation(
+    S: list[int] | np.ndarray,
+    p: list[int],
+    test_list: list[int],
+    backend: str,
+    seed: int,
+    stream: tuple[int, ...],
+    index: int,
+    profile: SequenceProfile | None = None,
+) -> list[float]:
+    """Recomputes the test results of a single permutation of a seeded run, without storing the permutations.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+    p : list of int
+        list of p values
+    test_list : list of int
+        list of test indexes to run
+    backend : str
+        implementation of the test statistics used in the run, one of BACKENDS
+    seed : int
+        the seed of the run
+    stream : tuple of int
+        the key of the random stream of the run
+    index : int
+        the index of the permutation in the stream
+    profile : SequenceProfile | None
+        the profile of the sequence, computed if None
+
+    Returns
+    -------
+    list of float
+        list of tests results
+    """
+    return run_tests_shuffle(S, p, test_list, backend, permutation_seed_sequence(seed, stream, index), profile)
+
+
+def run_tests_shuffle_batch(
+    S: list[int] | np.ndarray,
+    p: list[int],
+    test_list: list[int],
+    seed_sequences: list[np.random.SeedSequence],
+    profile: SequenceProfile | None = None,
+    buffers: ShuffleBuffers | None = None,
+) -> np.ndarray:
+    """Generates a batch of independent Fisher-Yates shuffles of a given sequence, then runs a list of tests on all the
+    shuffled sequences at once, using the NumPy implementation of the test statistics.
+
+    The batch is shuffled in the buffers of the sequence, if provided, and in a new array otherwise.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+
+    p : list of int
+        list of p values
+
+    test_list : list of int
+        list of test indexes to run
+
+    seed_sequences : list of np.random.SeedSequence
+        the seed of the random stream of each shuffled sequence
+
+    profile : SequenceProfile | None
+        the profile of the sequence, computed if None
+
+    buffers : ShuffleBuffers | None
+        the buffers of the sequence, see shuffle_buffers()
+
+    Returns
+    -------
+    np.ndarray
+        tests results, one row for each shuffled sequence
+    """
+    S = permutation_tests_numpy.as_array(S)
+    if profile is None:
+        profile = sequence_profile(S)
+    rngs = [permutation_tests_numpy.generator(s) for s in seed_sequences]
+    S_batch = permutation_tests_numpy.FY_shuffle_batch(S, rngs, None if buffers is None else buffers.batch(len(rngs)))
+    return _run_tests_numpy(S_batch, p, test_list, profile)
+
+
+SharedSequence = typing.NamedTuple("SharedSequence", [("name", str), ("length", int)])
+
+# Shared sequences attached by the current process, by name
+_attached_sequences: dict[str, tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+@contextlib.contextmanager
+def shared_sequence(S: list[int] | np.ndarray) -> typing.Iterator[SharedSequence]:
+    """Places a sequence of symbols in shared memory for the duration of the context.
+
+    Worker processes attach to the shared sequence by name, so that a task only carries a small handle instead of the
+    whole sequence.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+
+    Yields
+    ------
+    SharedSequence
+        the picklable handle of the shared sequence
+    """
+    S = permutation_tests_numpy.as_array(S)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, S.nbytes))
+    try:
+        np.ndarray(S.shape, dtype=np.uint8, buffer=shm.buf)[:] = S
+        yield SharedSequence(shm.name, len(S))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _attach_sequence(S_shared: SharedSequence) -> np.ndarray:
+    """Returns a read-only view of a shared sequence, attaching to it on first use in the current process.
+
+    Parameters
+    ----------
+    S_shared : SharedSequence
+        the handle of the shared sequence
+
+    Returns
+    -------
+    np.ndarray
+        sequence of sample values
+    """
+    if S_shared.name not in _attached_sequences:
+        # Worker processes share the resource tracker of the creating process, which owns and unlinks the segment
+        shm = shared_memory.SharedMemory(name=S_shared.name)
+        S = np.ndarray((S_shared.length,), dtype=np.uint8, buffer=shm.buf)
+        S.flags.writeable = False
+        _attached_sequences[S_shared.name] = (shm, S)
+    return _attached_sequences[S_shared.name][1]
+
+
+def run_tests_chunk(
+    S: list[int] | np.ndarray,
+    p: list[int],
+    test_list: list[int],
+    backend: str,
+    batch_size: int,
+    seed: int,
+    stream: tuple[int, ...],
+    start: int,
+    n_permutations: int,
+    profile: SequenceProfile | None = None,
+) -> np.ndarray:
+    """Runs run_tests_shuffle() on n_permutations shuffled sequences, or run_tests_shuffle_batch() on batches of
+    batch_size shuffled sequences if batch_size > 1.
+
+    The shuffled sequences are the permutations with indexes [start, start + n_permutations) of the given random stream,
+    shuffled in the buffers of the sequence in the current worker (see shuffle_buffers()). Their results are returned
+    as a single float64 array (test values are either floats or integers below 2^53, which float64 represents exactly,
+    e.g. the covariance of long sequences exceeds 2^32), which a worker process sends back as one buffer instead of one
+    object per value.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+    p : list of int
+        list of p values
+    test_list : list of int
+        list of test indexes to run
+    backend : str
+        implementation of the test statistics, one of BACKENDS
+    batch_size : int
+        number of sequences to shuffle and test at once (NumPy backend only)
+    seed : int
+        the seed of the run
+    stream : tuple of int
+        the key of the random stream of the run
+    start : int
+        the index of the first permutation in the stream
+    n_permutations : int
+        number of shuffled sequences to test
+    profile : SequenceProfile | None
+        the profile of the sequence, computed once for the chunk if None
+
+    Returns
+    -------
+    np.ndarray
+        tests results, one row for each shuffled sequence
+    """
+    if profile is None:
+        profile = sequence_profile(S)
+    seed_sequences = [permutation_seed_sequence(seed, stream, i) for i in range(start, start + n_permutations)]
+    buffers = shuffle_buffers(S)
+    if batch_size > 1 and n_permutations > 0:
+        return np.concatenate(
+            [
+                run_tests_shuffle_batch(S, p, test_list, seed_sequences[i : i + batch_size], profile, buffers)
+                for i in range(0, n_permutations, batch_size)
+            ]
+        )
+    return np.array(
+        [
+            run_tests_shuffle(S, p, test_list, backend, seed_sequence, profile, buffers)
+            for seed_sequence in seed_sequences
+        ],
+        dtype=np.float64,
+    )
+
+
+def reduce_tests_chunk(S: list[int] | np.ndarray, Tx: list[float], *args) -> "TestSummary":
+    """Runs run_tests_chunk(S, *args) and reduces its results with summarize_tests().
+
+    A worker running this function in place of run_tests_chunk() returns a few counters per test, whatever the number
+    of permutations of the chunk, when the test values themselves are not needed.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+    Tx : list of float
+        reference test values
+    args
+        the other arguments of run_tests_chunk()
+
+    Returns
+    -------
+    TestSummary
+        summary of the tests results of the chunk
+    """
+    return summarize_tests(Tx, run_tests_chunk(S, *args))
+
+
+def _warm_up() -> None:
+    """Runs all the test statistics of the python and numpy backends once on a short sequence.
+
+    The first calls of the NumPy kernels and of the bz2 compressor initialize internal state (e.g. the dispatch of the
+    ufunc loops and the compression tables), which is then paid before the first task instead of during it. The kernels
+    of the numba backend are not warmed up, as compiling them would slow down the start of the workers of the other
+    backends: they are compiled on their first call, and cached on disk for the following runs.
+    """
+    S = np.arange(64, dtype=np.uint8) % 4
+    test_list = [t.id for t in tests]
+    run_tests(S.tolist(), [1], test_list, BACKEND_PYTHON)
+    run_tests_shuffle_batch(S, [1], test_list, [np.random.SeedSequence(0), np.random.SeedSequence(1)])
+
+
+def _pin_worker(cpus: list[int], counter: typing.Any) -> None:
+    """Pins the calling worker thread or process to a single CPU, the next one of cpus in the order in which the workers
+    start.
+
+    Parameters
+    ----------
+    cpus : list of int
+        the CPUs to pin the workers to
+    counter : multiprocessing.Value
+        the number of workers started so far, shared by the workers
+    """
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+
+
+def _register_worker(pids: typing.Any) -> None:
+    """Records the process id of the calling worker process in the first free slot of pids, if any.
+
+    Parameters
+    ----------
+    pids : multiprocessing.Array
+        the process ids of the workers started so far, 0 for the free slots, shared by the workers
+    """
+    with pids.get_lock():
+        for i, pid in enumerate(pids):
+            if pid == 0:
+                pids[i] = os.getpid()
+                return
+
+
+def _init_worker(
+    sequences: list[SharedSequence],
+    cpus: list[int] | None = None,
+    counter: typing.Any = None,
+    compression_threads: int = 1,
+    pids: typing.Any = None,
+) -> None:
+    """Initializes a worker process: records its process id, leaves the interruptions to the main process, pins the
+    worker to a CPU if required, sizes its compression threads, attaches the shared sequences known when the pool is
+    started, and warms up the test statistics.
+
+    Parameters
+    ----------
+    sequences : list of SharedSequence
+        the handles of the shared sequences
+    cpus : list of int | None
+        the CPUs to pin the workers to (see _pin_worker()), None to leave the worker unpinned
+    counter : multiprocessing.Value
+        the number of workers started so far, shared by the workers
+    compression_threads : int
+        number of threads compressing the sequences of a batch in the worker
+    pids : multiprocessing.Array | None
+        the process ids of the workers (see _register_worker()), None not to record them
+    """
+    if pids is not None:
+        _register_worker(pids)
+    # Interruptions are handled by the main process, which terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if cpus:
+        _pin_worker(cpus, counter)
+    permutation_tests_numpy.set_compression_threads(compression_threads)
+    for S_shared in sequences:
+        _attach_sequence(S_shared)
+    _warm_up()
+
+
+def _run_shared(function: typing.Callable, S_shared: SharedSequence, *args) -> typing.Any:
+    """Runs function(S, *args) in a worker process on a shared sequence S.
+
+    Parameters
+    ----------
+    function : callable
+        the function to run, taking the sequence as its first argument
+    S_shared : SharedSequence
+        the handle of the shared sequence
+    args
+        the other arguments of the function
+
+    Returns
+    -------
+    any
+        the value returned by the function
+    """
+    return function(_attach_sequence(S_shared), *args)
+
+
+class WorkerPool:
+    """A pool of workers running the permutations, reused by all the runs of a session.
+
+    The threads or processes are started on first use and kept until the pool is closed, so that the NIST test and all
+    the iterations of the statistical analysis pay the start of the workers only once. With EXECUTOR_PROCESS, each
+    input sequence is placed in shared memory once for the lifetime of the pool, and the worker processes keep it
+    attached between tasks. With EXECUTOR_SERIAL, no worker is started.
+
+    The worker processes are started with the given multiprocessing start method, by default the one of the platform:
+    - "fork" starts them fastest, as copies of the main process;
+    - "forkserver" forks them from a server process which has imported this module once, so that they start without
+      importing it again, and without inheriting the state of the main process;
+    - "spawn" starts them as new interpreters, which import the whole module graph.
+    Each worker process is initialized by _init_worker(), which attaches the sequences shared so far and warms up the
+    test statistics. The time from the start of the pool to its first result is logged.
+
+    By default, the pool has one worker per CPU available to the process (see cpu.available_cpus()). With pin, each
+    worker is pinned to one of the CPUs of the affinity mask of the process, in turn, so that it keeps its caches
+    during long runs instead of migrating between CPUs. The threads compressing the batches of the numpy backend are
+    shared out between the worker processes, and the worker threads share those of the main process, so that the pool
+    does not run more compression threads than CPUs.
+
+    Parameters
+    ----------
+    executor : str
+        how the permutations are run, one of EXECUTORS
+    workers : int
+        number of parallel workers, 0 for the number of available CPUs
+    start_method : str | None
+        start method of the worker processes, one of START_METHODS, the default of the platform if None
+    pin : bool
+        pin each worker to a single CPU
+    """
+
+    def __init__(
+        self, executor: str = EXECUTOR_PROCESS, workers: int = 0, start_method: str | None = None, pin: bool = False
+    ) -> None:
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unsupported executor: {executor}, supported {EXECUTORS}")
+        if start_method is not None and start_method not in START_METHODS:
+            raise ValueError(f"Unsupported start method: {start_method}, supported {START_METHODS}")
+        if pin and not hasattr(os, "sched_setaffinity"):
+            raise ValueError("Pinning the workers to CPUs is not supported on this platform")
+        self.executor = executor
+        self.n_workers = workers or cpu.available_cpus()
+        self.start_method = start_method
+        self.pin = pin
+        self._pool: concurrent.futures.Executor | None = None
+        # Process ids of the worker processes, recorded by the workers as they start
+        self._pids: typing.Any = None
+        # Start time of the pool, until its first result
+        self._t_start: float | None = None
+        self._lock = threading.Lock()
+        # Shared sequences, by digest of their symbols
+        self._sequences: dict[bytes, SharedSequence] = {}
+        self._resources = contextlib.ExitStack()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def sequence(self, S: list[int] | np.ndarray) -> list[int] | np.ndarray | SharedSequence:
+        """Returns the argument to pass to submit() in place of a sequence.
+
+        Parameters
+        ----------
+        S : list of int or np.ndarray
+            sequence of sample values
+
+        Returns
+        -------
+        list of int or np.ndarray or SharedSequence
+            the sequence itself for threads, the handle of the sequence in shared memory for processes
+        """
+        if self.executor != EXECUTOR_PROCESS:
+            return S
+        S = permutation_tests_numpy.as_array(S)
+        key = hashlib.sha256(S).digest()
+        if key not in self._sequences:
+            self._sequences[key] = self._resources.enter_context(shared_sequence(S))
+        return self._sequences[key]
+
+    def submit(
+        self, function: typing.Callable, S_task: list[int] | np.ndarray | SharedSequence, *args
+    ) -> concurrent.futures.Future:
+        """Schedules function(S, *args) on a worker, e.g. run_tests_chunk().
+
+        Parameters
+        ----------
+        function : callable
+            a module-level function taking the sequence as its first argument
+        S_task : list of int or np.ndarray or SharedSequence
+            the sequence S returned by sequence()
+        args
+            the other arguments of the function
+
+        Returns
+        -------
+        concurrent.futures.Future
+            the future value returned by the function
+        """
+        if self.executor == EXECUTOR_SERIAL:
+            raise ValueError(f"The {EXECUTOR_SERIAL} executor has no workers")
+        if self._pool is None:
+            self._start()
+        if self.executor == EXECUTOR_PROCESS:
+            future = self._pool.submit(_run_shared, function, S_task, *args)
+        else:
+            future = self._pool.submit(function, S_task, *args)
+        if self._t_start is not None:
+            future.add_done_callback(self._first_result)
+        return future
+
+    def _start(self) -> None:
+        """Starts the pool of workers."""
+        self._t_start = time.perf_counter()
+        context = multiprocessing.get_context(self.start_method)
+        cpus = cpu.affinity_cpus() if self.pin else None
+        counter = context.Value("i", 0)
+        if self.executor == EXECUTOR_THREAD:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                self.n_workers, initializer=_pin_worker if cpus else None, initargs=(cpus, counter)
+            )
+            return
+        if context.get_start_method() == "forkserver":
+            context.set_forkserver_preload([__name__])
+        self._pids = context.Array("i", self.n_workers)
+        self._pool = concurrent.futures.ProcessPoolExecutor(
+            self.n_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                list(self._sequences.values()),
+                cpus,
+                counter,
+                max(1, cpu.available_cpus() // self.n_workers),
+                self._pids,
+            ),
+        )
+        logger.debug(
+            "Starting %s worker processes (%s)%s",
+            self.n_workers,
+            context.get_start_method(),
+            f", pinned to CPUs {cpus}" if cpus else "",
+        )
+
+    def _first_result(self, future: concurrent.futures.Future) -> None:
+        """Logs the time to the first result of the pool, called when each task is done until then."""
+        if future.cancelled():
+            return
+        with self._lock:
+            if self._t_start is None:
+                return
+            logger.info(
+                "First result of the %s workers after %.3f s", self.n_workers, time.perf_counter() - self._t_start
+            )
+            self._t_start = None
+
+    def close(self) -> None:
+        """Stops the workers, after the tasks already running, and releases the shared sequences."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            self._pids = None
+        self._resources.close()
+        self._sequences.clear()
+
+    def terminate(self) -> None:
+        """Stops the workers at once, e.g. when the run is interrupted: the pending tasks are cancelled and the worker
+        processes are killed with their running tasks. Worker threads cannot be killed, their running tasks complete in
+        the background.
+
+        The pool can be used again, with new workers.
+        """
+        if self._pool is None:
+            return
+        # The worker processes are children of this process, found by the process ids they recorded
+        processes = []
+        if self._pids is not None:
+            with self._pids.get_lock():
+                pids = set(self._pids) - {0}
+            processes = [process for process in multiprocessing.active_children() if process.pid in pids]
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        self._pool = None
+        self._pids = None
+        logger.debug("Workers terminated")
+
+
+@contextlib.contextmanager
+def deferred_interrupts() -> typing.Iterator[None]:
+    """Defers SIGINT and SIGTERM to the end of the block, e.g. to update results consistently.
+
+    A signal received within the block is raised again once the block is complete, with the handler in place before the
+    block, e.g. the KeyboardInterrupt of SIGINT. Signals are only received by the main thread, so the interruptions are
+    not deferred in the other threads.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    received: list[int] = []
+    handlers = {s: signal.signal(s, lambda signum, frame: received.append(signum)) for s in INTERRUPT_SIGNALS}
+    try:
+        yield
+    finally:
+        for s, handler in handlers.items():
+            signal.signal(s, handler)
+        for s in received:
+            signal.raise_signal(s)
+
+
+def auto_chunk_size(n_permutations: int, n_workers: int) -> int:
+    """Chooses the number of permutations run by each parallel task.
+
+    Each worker receives about CHUNKS_PER_WORKER tasks: enough to balance the load and to report progress smoothly,
+    few enough to keep the scheduling overhead negligible.
+
+    Parameters
+    ----------
+    n_permutations : int
+        total number of permutations
+    n_workers : int
+        number of workers
+
+    Returns
+    -------
+    int
+        number of permutations per task, at least 1
+    """
+    return max(1, math.ceil(n_permutations / (n_workers * CHUNKS_PER_WORKER)))
+
+
+def sorted_population(Ti: list[list[float]] | np.ndarray, n_tests: int) -> np.ndarray:
+    """Sorts the test values calculated on shuffled sequences, test by test.
+
+    Parameters
+    ----------
+    Ti : list of lists of float or np.ndarray
+        test values calculated on shuffled sequences, one row per sequence
+    n_tests : int
+        number of test values per sequence
+
+    Returns
+    -------
+    np.ndarray
+        sorted test values, one row per test
+    """
+    return np.sort(np.asarray(Ti, dtype=np.float64).reshape(len(Ti), n_tests).T, axis=-1)
+
+
+def population_counters(population: np.ndarray, Tx: list[float] | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Computes the counters C0 and C1 of reference test values against a sorted population of test values.
+
+    The counters of each reference value are found by bisection, in O(log n_permutations): C0 is the number of values
+    of the population smaller than Tx, C1 the number of values equal to Tx. A single population can score several sets
+    of reference values, one per row of Tx.
+
+    Parameters
+    ----------
+    population : np.ndarray
+        test values calculated on shuffled sequences, as returned by sorted_population()
+    Tx : list of float or np.ndarray
+        reference test values, or several sets of reference test values along the first axes
+
+    Returns
+    -------
+    np.ndarray, np.ndarray
+        counters C0, counters C1, with the shape of Tx
+    """
+    Tx = np.asarray(Tx, dtype=np.float64)
+    C0 = np.empty(Tx.shape, dtype=np.int64)
+    C1 = np.empty(Tx.shape, dtype=np.int64)
+    for u in range(len(population)):
+        C0[..., u] = np.searchsorted(population[u], Tx[..., u], side="left")
+        C1[..., u] = np.searchsorted(population[u], Tx[..., u], side="right") - C0[..., u]
+    return C0, C1
 
 
 def calculate_counters(Tx: list[float], Ti: list[list[float]]) -> tuple[list[int], list[int]]:
     """Computes the counters C0 and C1 for the selected tests.
 
     For each test, the reference value Tx is compared to the list of values Ti: for each element of Ti, C0 is
-    incremented if Ti is bigger than Tx, C1 is incremented if they are equal.
+    incremented if Ti is smaller than Tx, C1 is incremented if they are equal. See population_counters().
 
     Parameters
     ----------
@@ -554,44 +1811,555 @@ def calculate_counters(Tx: list[float], Ti: list[list[float]]) -> tuple[list[int
     list of int, list of int
         list of counters C0, list of counters C1
     """
+    C0, C1 = population_counters(sorted_population(Ti, len(Tx)), Tx)
+    return C0.tolist(), C1.tolist()
 
-    C0 = [0] * len(Tx)
-    C1 = [0] * len(Tx)
 
-    for u in range(len(Tx)):
-        for t in range(len(Ti)):
-            if Tx[u] > Ti[t][u]:
-                C0[u] += 1
-            if Tx[u] == Ti[t][u]:
-                C1[u] += 1
+def iid_result(C0: list[int] | np.ndarray, C1: list[int] | np.ndarray, n_permutations: int) -> bool | np.ndarray:
+    """Determines whether the sequence is IID by checking that the value of the reference result Tx is between 0.05% and
+    99.95% of the results Ti for the rest of the population of n_permutations sequences.
 
-    return C0, C1
+    Several sets of counters, along the first axes of C0 and C1, are evaluated at once.
 
+    Parameters
+    ----------
+    C0 : list of int or np.ndarray
+        counter 0
+    C1 : list of int or np.ndarray
+        counter 1
+    n_permutations : int
+        number of sequences in the population
 
-def iid_result(C0: list[int], C1: list[int], n_permutations: int) -> bool:
-    """Determines whether the sequence is IID by checking that the value of the reference result Tx is between 0.05% and
-    99.95% of the results Ti for the rest of the population of n_permutations sequences.
+    Returns
+    -------
+    bool or np.ndarray
+        iid result, or iid result of each set of counters
+    """
+    C0 = np.asarray(C0)
+    C1 = np.asarray(C1)
+    if C0.shape != C1.shape:
+        raise Exception(f"Counter lengths must match: C0 ({C0.shape[-1]}), C1 ({C1.shape[-1]})")
+    rejected = (C0 + C1 <= 0.0005 * n_permutations) | (C0 >= 0.9995 * n_permutations)
+    result = ~np.any(rejected, axis=-1)
+    return result.item() if result.ndim == 0 else result
+
+
+def iid_result_decided(C0: list[int], C1: list[int], n_computed: int, n_permutations: int) -> bool | None:
+    """Determines whether the iid result of a population of n_permutations sequences is already decided by the counters
+    of its first n_computed sequences, whatever the results of the remaining ones.
+
+    The result is decided as rejected when a test can no longer satisfy the bounds of iid_result(), and as validated
+    when every test satisfies them even if all the remaining sequences count against it.
 
     Parameters
     ----------
     C0 : list of int
-        counter 0
+        counter 0 over the computed sequences
     C1 : list of int
-        counter 1
+        counter 1 over the computed sequences
+    n_computed : int
+        number of computed sequences
     n_permutations : int
         number of sequences in the population
 
     Returns
     -------
-    bool
-        iid result
+    bool | None
+        iid result, None if it is not decided yet
     """
     if len(C0) != len(C1):
         raise Exception(f"Counter lengths must match: C0 ({len(C0)}), C1 ({len(C1)})")
-    for b in range(len(C0)):
-        if (C0[b] + C1[b] <= 0.0005 * n_permutations) or (C0[b] >= 0.9995 * n_permutations):
-            return False
-    return True
+    rejected, validated = _decided_counters(np.asarray(C0), np.asarray(C1), n_computed, n_permutations)
+    if rejected:
+        return False
+    return True if validated else None
+
+
+def _decided_counters(
+    C0: np.ndarray, C1: np.ndarray, n_computed: int | np.ndarray, n_permutations: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Evaluates the bounds of iid_result_decided() on several sets of counters at once, along the first axes of C0
+    and C1.
+
+    Parameters
+    ----------
+    C0 : np.ndarray
+        counter 0 over the computed sequences
+    C1 : np.ndarray
+        counter 1 over the computed sequences
+    n_computed : int or np.ndarray
+        number of computed sequences, or number of computed sequences of each set of counters
+    n_permutations : int
+        number of sequences in the population
+
+    Returns
+    -------
+    np.ndarray, np.ndarray
+        whether each set of counters is decided as rejected, whether it is decided as validated
+    """
+    n_remaining = np.expand_dims(n_permutations - np.asarray(n_computed), -1)
+    rejected = (C0 + C1 + n_remaining <= 0.0005 * n_permutations) | (C0 >= 0.9995 * n_permutations)
+    undecided = (C0 + C1 <= 0.0005 * n_permutations) | (C0 + n_remaining >= 0.9995 * n_permutations)
+    return np.any(rejected, axis=-1), ~np.any(undecided, axis=-1)
+
+
+class Histogram:
+    """Histogram of the values of a test on HISTOGRAM_BINS consecutive bins of equal width, covering the range of the
+    values.
+
+    The bins are taken from a fixed grid of levels. At the finest level, the bins have width HISTOGRAM_RESOLUTION and
+    the integers lie on their edges. Each bin of the next level merges two consecutive bins of the previous one, so
+    that the bins of width 1 are centered on the integers, as the integer tests need. The histogram is kept at the
+    finest level at which HISTOGRAM_BINS bins cover all the added values, starting from the bin of the lowest one.
+
+    The bins of a set of values only depend on the values, so the histogram does not depend on the order in which they
+    are added, or on how the histograms of their subsets are merged. Its size does not depend on the number of values
+    either.
+    """
+
+    def __init__(self, level: int = 0, low: int = 0, counts: list[int] | None = None) -> None:
+        """Constructs a histogram, empty if counts is None.
+
+        Parameters
+        ----------
+        level : int
+            level of the bins, whose width is HISTOGRAM_RESOLUTION * 2**level
+        low : int
+            index of the first bin in the grid of the level
+        counts : list of int | None
+            number of values in each bin
+        """
+        self.level = level
+        self.low = low
+        self.counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64) if counts is None else np.array(counts, dtype=np.int64)
+        if self.counts.shape != (HISTOGRAM_BINS,):
+            raise ValueError(f"Histogram has {self.counts.size} bins, expected {HISTOGRAM_BINS}")
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def width(self) -> float:
+        return HISTOGRAM_RESOLUTION * 2**self.level
+
+    def edges(self) -> np.ndarray:
+        """Returns the edges of the bins.
+
+        Returns
+        -------
+        np.ndarray
+            the HISTOGRAM_BINS + 1 edges of the bins, in increasing order
+        """
+        k = np.arange(self.low, self.low + HISTOGRAM_BINS + 1, dtype=np.float64)
+        return (k * 2**self.level - _HISTOGRAM_OFFSET) * HISTOGRAM_RESOLUTION
+
+    def add(self, values: list[float] | np.ndarray) -> None:
+        """Adds values to the histogram, raising its level if needed.
+
+        Parameters
+        ----------
+        values : list of float or np.ndarray
+            test values
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        # Index of the bin of each value at the finest level
+        index = np.floor(values / HISTOGRAM_RESOLUTION).astype(np.int64) + _HISTOGRAM_OFFSET
+        self._cover(0, int(index.min()), int(index.max()))
+        self.counts += np.bincount((index >> self.level) - self.low, minlength=HISTOGRAM_BINS)
+
+    def merge(self, other: "Histogram") -> None:
+        """Adds the values of another histogram.
+
+        Parameters
+        ----------
+        other : Histogram
+            histogram to add
+        """
+        filled = np.flatnonzero(other.counts)
+        if filled.size == 0:
+            return
+        index = other.low + filled
+        self._cover(other.level, int(index[0]), int(index[-1]))
+        np.add.at(self.counts, (index >> (self.level - other.level)) - self.low, other.counts[filled])
+
+    def coarsen(self, level: int) -> None:
+        """Raises the level of the bins, merging them in pairs.
+
+        Parameters
+        ----------
+        level : int
+            new level of the bins, not lower than the current one
+        """
+        filled = np.flatnonzero(self.counts)
+        low = (self.low + filled[0]) >> (level - self.level) if filled.size else 0
+        self._rebin(level, low)
+
+    def _cover(self, level: int, low: int, high: int) -> None:
+        """Raises the level of the bins and moves them as needed for the bins to cover the filled ones and the bins
+        from low to high of the given level."""
+        filled = np.flatnonzero(self.counts)
+        if filled.size == 0:
+            self.level = level
+        else:
+            if level < self.level:
+                low, high = low >> (self.level - level), high >> (self.level - level)
+            low = min(low, (self.low + filled[0]) >> max(level - self.level, 0))
+            high = max(high, (self.low + filled[-1]) >> max(level - self.level, 0))
+        level = max(level, self.level)
+        shift = 0
+        while (high >> shift) - (low >> shift) >= HISTOGRAM_BINS:
+            shift += 1
+        self._rebin(level + shift, low >> shift)
+
+    def _rebin(self, level: int, low: int) -> None:
+        """Moves the values to the bins of a level not lower than the current one, starting from the bin low."""
+        filled = np.flatnonzero(self.counts)
+        counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        np.add.at(counts, ((self.low + filled) >> (level - self.level)) - low, self.counts[filled])
+        self.level, self.low, self.counts = level, int(low), counts
+
+    def state(self) -> dict[str, typing.Any]:
+        """Returns the state of the histogram, to construct it again with Histogram(**state).
+
+        Returns
+        -------
+        dict
+            JSON-serializable state of the histogram
+        """
+        return {"level": self.level, "low": self.low, "counts": self.counts.tolist()}
+
+
+TestSummary = typing.NamedTuple(
+    "TestSummary",
+    [
+        ("n", int),
+        ("C0", list[int]),
+        ("C1", list[int]),
+        ("histograms", list[Histogram]),
+        ("mean", list[float]),
+        ("M2", list[float]),
+    ],
+)
+
+
+def summarize_tests(Tx: list[float], Ti: list[list[float]] | np.ndarray) -> TestSummary:
+    """Reduces a block of test outputs to the quantities kept by TestAccumulator.
+
+    Parameters
+    ----------
+    Tx : list of float
+        reference test values
+    Ti : list of lists of float or np.ndarray
+        test values calculated on shuffled sequences, one row per sequence
+
+    Returns
+    -------
+    TestSummary
+        number of sequences, and for each test the counters C0 and C1 against Tx, the histogram of the test values,
+        their mean and their sum of squared deviations from the mean
+    """
+    Ti = np.asarray(Ti, dtype=np.float64).reshape(len(Ti), len(Tx))
+    Tx_array = np.asarray(Tx, dtype=np.float64)
+    histograms = [Histogram() for _ in Tx]
+    for histogram, values in zip(histograms, Ti.T):
+        histogram.add(values)
+    mean = Ti.mean(axis=0) if len(Ti) else np.zeros(len(Tx))
+    return TestSummary(
+        len(Ti),
+        np.count_nonzero(Ti < Tx_array, axis=0).tolist(),
+        np.count_nonzero(Ti == Tx_array, axis=0).tolist(),
+        histograms,
+        mean.tolist(),
+        np.sum(np.square(Ti - mean), axis=0).tolist(),
+    )
+
+
+class TestAccumulator:
+    """Accumulates the test outputs of the permutations without storing them.
+
+    For each test, the accumulator keeps the counters C0 and C1 against the reference value Tx, the histogram of the
+    test values and their running mean and variance. The results are accumulated in permutation order, whatever the
+    order in which they are added, and can be forwarded in the same order to a sink, e.g. a file writer.
+
+    Each block is accumulated at once: its summary (see summarize_tests()) is merged into the accumulated one, with the
+    pairwise update of the mean and variance of Chan et al. Blocks already reduced to a TestSummary, e.g. by the
+    workers, are merged the same way, but only without early_stop and sink, which need the test values.
+
+    With early_stop, the accumulation stops as soon as the iid result is decided (see iid_result_decided()): the
+    permutation after which it stops only depends on the random seed of the run.
+    """
+
+    def __init__(
+        self,
+        Tx: list[float],
+        n_permutations: int,
+        early_stop: bool = False,
+        sink: typing.Callable[[np.ndarray], None] | None = None,
+    ) -> None:
+        """Constructs an empty accumulator.
+
+        Parameters
+        ----------
+        Tx : list of float
+            reference test values
+        n_permutations : int
+            number of permutations in the population
+        early_stop : bool
+            stop the accumulation as soon as the iid result is decided
+        sink : callable | None
+            function called with each block of test outputs, in permutation order
+        """
+        self.Tx = Tx
+        self.n_permutations = n_permutations
+        self.early_stop = early_stop
+        self.sink = sink
+        self.n = 0
+        self.C0 = [0] * len(Tx)
+        self.C1 = [0] * len(Tx)
+        self.histograms = [Histogram() for _ in Tx]
+        self.mean = [0.0] * len(Tx)
+        self._M2 = [0.0] * len(Tx)
+        self.result: bool | None = None
+        # Blocks received ahead of the permutations not accumulated yet, by index of their first permutation
+        self._pending: dict[int, np.ndarray | TestSummary] = {}
+
+    def add(self, start: int, Ti: list[list[float]] | np.ndarray | TestSummary) -> bool:
+        """Adds a block of test outputs.
+
+        Parameters
+        ----------
+        start : int
+            index of the first permutation of the block
+        Ti : list of lists of float or np.ndarray or TestSummary
+            test outputs of the consecutive permutations from start, one row per permutation, or their summary
+
+        Returns
+        -------
+        bool
+            True if the accumulation is complete, i.e. the iid result is decided with early_stop
+        """
+        if isinstance(Ti, TestSummary):
+            if self.early_stop or self.sink:
+                raise ValueError("Summaries of test outputs cannot be accumulated with early_stop or a sink")
+            self._pending[start] = Ti
+        else:
+            self._pending[start] = np.asarray(Ti, dtype=np.float64).reshape(len(Ti), len(self.Tx))
+        while self.result is None and self.n in self._pending:
+            block = self._pending.pop(self.n)
+            if isinstance(block, TestSummary):
+                self._merge(block)
+                continue
+            if self.early_stop:
+                block = block[: self._n_undecided(block)]
+            self._merge(summarize_tests(self.Tx, block))
+            if self.early_stop:
+                self.result = iid_result_decided(self.C0, self.C1, self.n, self.n_permutations)
+            if self.sink:
+                self.sink(block)
+        return self.result is not None
+
+    def _n_undecided(self, block: np.ndarray) -> int:
+        """Returns the number of permutations of a block to accumulate until the iid result is decided, i.e. the whole
+        block if it is still undecided after its last permutation."""
+        C0 = np.cumsum(block < np.asarray(self.Tx), axis=0) + self.C0
+        C1 = np.cumsum(block == np.asarray(self.Tx), axis=0) + self.C1
+        n_computed = self.n + np.arange(1, len(block) + 1)
+        rejected, validated = _decided_counters(C0, C1, n_computed, self.n_permutations)
+        decided = rejected | validated
+        return int(np.argmax(decided)) + 1 if decided.any() else len(block)
+
+    def _merge(self, summary: TestSummary) -> None:
+        """Accumulates the summary of the test outputs of the permutations following the accumulated ones."""
+        if summary.n == 0:
+            return
+        n = self.n + summary.n
+        for u in range(len(self.Tx)):
+            self.C0[u] += summary.C0[u]
+            self.C1[u] += summary.C1[u]
+            self.histograms[u].merge(summary.histograms[u])
+            delta = summary.mean[u] - self.mean[u]
+            self.mean[u] += delta * summary.n / n
+            self._M2[u] += summary.M2[u] + delta * delta * self.n * summary.n / n
+        self.n = n
+
+    def state(self) -> dict[str, typing.Any]:
+        """Returns the state of the accumulated permutations, to restore it with restore().
+
+        The blocks added ahead of the accumulated permutations are not part of the state.
+
+        Returns
+        -------
+        dict
+            JSON-serializable state of the accumulator
+        """
+        return {
+            "n": self.n,
+            "C0": self.C0,
+            "C1": self.C1,
+            "histograms": [h.state() for h in self.histograms],
+            "mean": self.mean,
+            "M2": self._M2,
+        }
+
+    def restore(self, state: dict[str, typing.Any]) -> None:
+        """Restores the state returned by state(), e.g. to resume a run.
+
+        Parameters
+        ----------
+        state : dict
+            state of the accumulator
+        """
+        if len(state["C0"]) != len(self.Tx):
+            raise ValueError(f"Accumulator state has {len(state['C0'])} tests, expected {len(self.Tx)}")
+        self.n = state["n"]
+        self.C0 = list(state["C0"])
+        self.C1 = list(state["C1"])
+        self.histograms = [Histogram(**h) for h in state["histograms"]]
+        self.mean = list(state["mean"])
+        self._M2 = list(state["M2"])
+        self._pending = {}
+        self.result = None
+        if self.early_stop:
+            self.result = iid_result_decided(self.C0, self.C1, self.n, self.n_permutations)
+
+    def stdev(self) -> list[float]:
+        """Returns the sample standard deviation of the accumulated values of each test.
+
+        Returns
+        -------
+        list of float
+            standard deviation of each test
+        """
+        if self.n < 2:
+            raise ValueError("Standard deviation requires at least two accumulated permutations")
+        return [math.sqrt(M2 / (self.n - 1)) for M2 in self._M2]
+
+
+def _run_permutations(
+    S: list[int] | np.ndarray,
+    n_permutations: int,
+    selected_tests: list[int],
+    p: list[int],
+    consume: typing.Callable[[int, np.ndarray | TestSummary], bool],
+    executor: str,
+    workers: int,
+    standalone_progress: bool,
+    backend: str,
+    batch_size: int,
+    chunk_size: int,
+    seed: int | None,
+    stream: tuple[int, ...],
+    first: int = 0,
+    profile: SequenceProfile | None = None,
+    pool: WorkerPool | None = None,
+    reduce_Tx: list[float] | None = None,
+) -> None:
+    """Executes the NIST test suite on the shuffled sequences from the first-th to the n_permutations-th, passing the
+    results to consume().
+
+    consume() receives the index of the first permutation of each block of results and the block itself, as the blocks
+    are completed; if it returns True, the pending permutations are cancelled. If reduce_Tx is not None, the parallel
+    tasks reduce their blocks against the reference values reduce_Tx with reduce_tests_chunk(), and consume() receives
+    their TestSummary instead.
+
+    An interruption (KeyboardInterrupt, e.g. from SIGINT or SIGTERM) cancels the pending permutations and terminates
+    the workers at once; it is deferred while consume() runs, so that the blocks are either consumed entirely or not
+    at all.
+
+    See run_tests_permutations() for the description of the other parameters.
+    """
+    if pool is not None:
+        executor = pool.executor
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unsupported executor: {executor}, supported {EXECUTORS}")
+    if seed is None:
+        seed = new_seed()
+        logger.debug("Shuffling with random seed %s", seed)
+    # The NumPy and JIT-compiled implementations work on a compact array, which is also cheaper to send to worker
+    # processes
+    if backend in (BACKEND_NUMPY, BACKEND_NUMBA):
+        S = permutation_tests_numpy.as_array(S)
+    # Computed once for all the permutations, and sent to the worker processes with each task
+    if profile is None:
+        profile = sequence_profile(S)
+
+    if batch_size > 1:
+        if backend != BACKEND_NUMPY:
+            raise ValueError(f"Batch mode requires the {BACKEND_NUMPY} backend")
+        max_batch_size = permutation_tests_numpy.max_batch_size(len(S))
+        if batch_size > max_batch_size:
+            logger.debug("Batch size %s exceeds the memory limit, reduced to %s", batch_size, max_batch_size)
+            batch_size = max_batch_size
+
+    if executor != EXECUTOR_SERIAL:
+        with contextlib.ExitStack() as stack:
+            if pool is None:
+                pool = stack.enter_context(WorkerPool(executor, workers))
+            if chunk_size < 1:
+                chunk_size = auto_chunk_size(n_permutations, pool.n_workers)
+            S_task = pool.sequence(S)
+            futures = {}
+            for start in range(first, n_permutations, chunk_size):
+                args = (
+                    p,
+                    selected_tests,
+                    backend,
+                    batch_size,
+                    seed,
+                    stream,
+                    start,
+                    min(chunk_size, n_permutations - start),
+                )
+                if reduce_Tx is None:
+                    futures[pool.submit(run_tests_chunk, S_task, *args, profile)] = start
+                else:
+                    futures[pool.submit(reduce_tests_chunk, S_task, reduce_Tx, *args, profile)] = start
+
+            with tqdm(
+                total=n_permutations,
+                initial=first,
+                desc="Running test suite runs in parallel",
+                position=0 if standalone_progress else 1,
+                leave=standalone_progress,
+            ) as progress:
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        start = futures[future]
+                        progress.update(min(chunk_size, n_permutations - start))
+                        with deferred_interrupts():
+                            complete = consume(start, future.result())
+                        if complete:
+                            # Tasks already running are completed in the background, the others are never started
+                            for pending in futures:
+                                pending.cancel()
+                            break
+                except KeyboardInterrupt:
+                    logger.warning("Interrupted, cancelling %s pending tasks", sum(not f.done() for f in futures))
+                    pool.terminate()
+                    raise
+    else:
+        with tqdm(total=n_permutations, initial=first, desc="Running test suite runs") as progress:
+            for start in range(first, n_permutations, batch_size):
+                result = run_tests_chunk(
+                    S,
+                    p,
+                    selected_tests,
+                    backend,
+                    batch_size,
+                    seed,
+                    stream,
+                    start,
+                    min(batch_size, n_permutations - start),
+                    profile,
+                )
+                progress.update(len(result))
+                with deferred_interrupts():
+                    complete = consume(start, result)
+                if complete:
+                    break
 
 
 def run_tests_permutations(
@@ -599,14 +2367,41 @@ def run_tests_permutations(
     n_permutations: int,
     selected_tests: list[int],
     p: list[int],
-    parallel: bool = True,
+    executor: str = EXECUTOR_PROCESS,
+    workers: int = 0,
     standalone_progress: bool = True,
-) -> list[list[float]]:
-    """Executes the NIST test suite on n_permutations shuffled sequences.
-
-    The sequences are tested in parallel depending on the parallel parameter (True by default).
-    Parallelization is achieved by multiprocessing, with the number of parallel processes corresponding to the number of
-    available processors.
+    backend: str = BACKEND_PYTHON,
+    batch_size: int = 1,
+    chunk_size: int = 0,
+    seed: int | None = None,
+    stream: tuple[int, ...] = (),
+    profile: SequenceProfile | None = None,
+    pool: WorkerPool | None = None,
+    first: int = 0,
+) -> np.ndarray:
+    """Executes the NIST test suite on n_permutations shuffled sequences, or on the ones from the first-th to the
+    n_permutations-th if first is not 0.
+
+    The sequences are tested by one of EXECUTORS, with workers parallel workers (by default, one per CPU):
+    - EXECUTOR_SERIAL tests them one after the other in the calling process, with no scheduling overhead;
+    - EXECUTOR_THREAD tests them on a pool of threads, which share the sequence and return their results without any
+      copy: the throughput scales with the workers as far as the test statistics release the GIL, which is mostly the
+      case for the NumPy backend (NumPy kernels and bz2) and not at all for the Python backend;
+    - EXECUTOR_PROCESS (the default) tests them on a pool of processes, which scales with the workers for both backends
+      at the cost of starting the processes and pickling the results, a single float64 array per task. The input
+      sequence is placed once in shared memory, where the worker processes attach to it.
+    The workers are started for the call, unless the permutations run on an existing pool: a WorkerPool shared by
+    several calls keeps its workers, and the sequences they are attached to, from one call to the next.
+    Each parallel task runs chunk_size permutations and returns their results as a single block; if chunk_size is 0,
+    it is chosen automatically with auto_chunk_size().
+
+    With the NumPy backend, the sequences can be shuffled and tested in batches of batch_size sequences at once. The
+    batch size is capped so that a batch fits in permutation_tests_numpy.BATCH_MEMORY_LIMIT.
+
+    The i-th permutation is drawn from the random stream permutation_seed_sequence(seed, stream, i), so the results,
+    which are returned in permutation order, do not depend on the parallelization, chunk size or batch size.
+
+    The permutation-invariant quantities of S (see sequence_profile()) are computed once, unless provided in profile.
 
     Parameters
     ----------
@@ -618,40 +2413,164 @@ def run_tests_permutations(
         indexes of the selected tests
     p : list of int
         parameter p
-    parallel: bool
-        Test sequences in parallel or not
+    executor : str
+        how the sequences are tested, one of EXECUTORS
+    workers : int
+        number of parallel workers, 0 for the number of CPUs
     standalone_progress: bool
         Display a standalone progress bar or a nested one
+    backend : str
+        implementation of the test statistics, one of BACKENDS
+    batch_size : int
+        number of sequences to shuffle and test at once (NumPy backend only)
+    chunk_size : int
+        number of permutations run by each parallel task, 0 for automatic
+    seed : int | None
+        the seed of the run, a new random seed if None
+    stream : tuple of int
+        the key of the random stream of the run
+    profile : SequenceProfile | None
+        the profile of the sequence, computed if None
+    pool : WorkerPool | None
+        the pool running the permutations, which replaces executor and workers; a new pool for the call if None
+    first : int
+        the index of the first permutation to test
 
     Returns
     -------
-    list of list of float
-        list of test outputs
+    np.ndarray
+        test outputs, one row per permutation
     """
-    Ti = []
+    Ti = np.empty((n_permutations - first, 0))
+
+    def collect(start: int, result: np.ndarray) -> bool:
+        nonlocal Ti
+        # The blocks are copied to their offset in the array of all the outputs, allocated with the first block
+        if Ti.shape[1] != result.shape[1]:
+            Ti = np.empty((n_permutations - first, result.shape[1]))
+        Ti[start - first : start - first + len(result)] = result
+        return False
+
+    _run_permutations(
+        S,
+        n_permutations,
+        selected_tests,
+        p,
+        collect,
+        executor,
+        workers,
+        standalone_progress,
+        backend,
+        batch_size,
+        chunk_size,
+        seed,
+        stream,
+        first,
+        profile,
+        pool,
+    )
+    return Ti
 
-    if parallel:
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            futures = []
-            for _ in range(n_permutations):
-                future = executor.submit(
-                    run_tests_shuffle,
-                    S,
-                    p,
-                    selected_tests,
-                )
-                futures.append(future)
 
-            for future in tqdm(
-                concurrent.futures.as_completed(futures),
-                total=len(futures),
-                desc="Running test suite runs in parallel",
-                position=0 if standalone_progress else 1,
-                leave=standalone_progress,
-            ):
-                Ti.append(future.result())
-    else:
-        for _ in tqdm(range(n_permutations), desc="Running test suite runs"):
-            result = run_tests_shuffle(S, p, selected_tests)
-            Ti.append(result)
-    return Ti
+def accumulate_tests_permutations(
+    S: list[int],
+    accumulator: TestAccumulator,
+    selected_tests: list[int],
+    p: list[int],
+    executor: str = EXECUTOR_PROCESS,
+    workers: int = 0,
+    standalone_progress: bool = True,
+    backend: str = BACKEND_PYTHON,
+    batch_size: int = 1,
+    chunk_size: int = 0,
+    seed: int | None = None,
+    stream: tuple[int, ...] = (),
+    checkpoint: typing.Callable[[TestAccumulator], None] | None = None,
+    checkpoint_interval: int = 0,
+    profile: SequenceProfile | None = None,
+    pool: WorkerPool | None = None,
+    reduce: bool = False,
+) -> None:
+    """Executes the NIST test suite on accumulator.n_permutations shuffled sequences, accumulating the results as they
+    are computed instead of returning them.
+
+    The run starts from the first permutation not accumulated yet, so an accumulator restored from a checkpoint resumes
+    the run where it was interrupted. If checkpoint_interval is not 0, checkpoint() is called with the accumulator each
+    time at least checkpoint_interval more permutations have been accumulated.
+
+    If the accumulator has early_stop enabled, the pending permutations are cancelled as soon as the iid result is
+    decided. With reduce, the parallel workers return the summary of their blocks (see reduce_tests_chunk()) instead
+    of the test values, which requires an accumulator without early_stop and sink. See run_tests_permutations() for
+    the description of the other parameters.
+
+    Parameters
+    ----------
+    S : list of int
+        sequence of sample values
+    accumulator : TestAccumulator
+        the accumulator of the test outputs
+    selected_tests : list of int
+        indexes of the selected tests
+    p : list of int
+        parameter p
+    executor : str
+        how the sequences are tested, one of EXECUTORS
+    workers : int
+        number of parallel workers, 0 for the number of CPUs
+    standalone_progress: bool
+        Display a standalone progress bar or a nested one
+    backend : str
+        implementation of the test statistics, one of BACKENDS
+    batch_size : int
+        number of sequences to shuffle and test at once (NumPy backend only)
+    chunk_size : int
+        number of permutations run by each parallel task, 0 for automatic
+    seed : int | None
+        the seed of the run, a new random seed if None
+    stream : tuple of int
+        the key of the random stream of the run
+    checkpoint : callable | None
+        function saving the state of the accumulator
+    checkpoint_interval : int
+        number of permutations between checkpoints, 0 to disable checkpoints
+    profile : SequenceProfile | None
+        the profile of the sequence, computed if None
+    pool : WorkerPool | None
+        the pool running the permutations, which replaces executor and workers; a new pool for the call if None
+    reduce : bool
+        reduce the test outputs to their summary in the parallel workers
+    """
+    if reduce and (accumulator.early_stop or accumulator.sink):
+        raise ValueError("Reducing in the workers requires an accumulator without early_stop and sink")
+    n_checkpoint = accumulator.n
+
+    def consume(start: int, result: np.ndarray | TestSummary) -> bool:
+        nonlocal n_checkpoint
+        complete = accumulator.add(start, result)
+        if checkpoint and checkpoint_interval and accumulator.n - n_checkpoint >= checkpoint_interval:
+            checkpoint(accumulator)
+            n_checkpoint = accumulator.n
+        return complete
+
+    if accumulator.result is None and accumulator.n < accumulator.n_permutations:
+        _run_permutations(
+            S,
+            accumulator.n_permutations,
+            selected_tests,
+            p,
+            consume,
+            executor,
+            workers,
+            standalone_progress,
+            backend,
+            batch_size,
+            chunk_size,
+            seed,
+            stream,
+            accumulator.n,
+            profile,
+            pool,
+            accumulator.Tx if reduce else None,
+        )
+    if accumulator.result is not None:
+        logger.info("IID result decided after %s of %s permutations", accumulator.n, accumulator.n_permutations)
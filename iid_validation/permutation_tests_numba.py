@@ -0,0 +1,383 @@
+import numpy as np
+
+from . import permutation_tests_numpy
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# JIT-compiled implementation of the permutation test statistics.
+# Each function mirrors its pure-Python counterpart in permutation_tests and returns identical results, but operates on
+# a single array of unsigned 8-bit symbols, which numba compiles to a native loop that releases the GIL.
+# numba is an optional dependency: without it, the functions are left as plain Python functions, and the numba backend
+# is replaced by the numpy backend (see permutation_tests.resolve_backend()).
+
+# Whether numba is installed
+AVAILABLE = numba is not None
+
+
+def _jit(function):
+    """Compiles a function with numba, releasing the GIL and caching the compiled code on disk, or returns it unchanged
+    if numba is not installed."""
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+@_jit
+def s_prime(S: np.ndarray) -> np.ndarray:
+    """Generates a transformed sequence based on the comparison of consecutive elements in the input sequence: -1 if
+    the first element is greater than the second, +1 otherwise.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    np.ndarray
+        new sequence of -1s and +1s, of length len(S) - 1
+    """
+    S_prime = np.empty(len(S) - 1, dtype=np.int8)
+    for i in range(len(S) - 1):
+        S_prime[i] = -1 if S[i] > S[i + 1] else 1
+    return S_prime
+
+
+@_jit
+def s_prime_median(S: np.ndarray, M: float) -> np.ndarray:
+    """Generates a transformed sequence where each original value is replaced with -1 if it is less than the median of
+    the original sequence, or 1 if it is greater than or equal to the median.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    M : float
+        the median of the sequence
+
+    Returns
+    -------
+    np.ndarray
+        new sequence of -1s and +1s
+    """
+    S_prime = np.empty(len(S), dtype=np.int8)
+    for i in range(len(S)):
+        S_prime[i] = -1 if S[i] < M else 1
+    return S_prime
+
+
+@_jit
+def compute_collisions(S: np.ndarray) -> np.ndarray:
+    """Counts the number of successive sample values until a duplicate is found.
+
+    A symbol belongs to the current block of samples if it was last seen after the end of the previous block, which
+    replaces the set of the symbols of the block of the pure-Python implementation.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    np.ndarray
+        numbers of samples observed to find a duplicate in the input sequence
+    """
+    # Position (from 1) of the last occurrence of each symbol
+    seen = np.zeros(256, dtype=np.int64)
+    # Each block has at least two samples
+    C = np.empty(len(S) // 2, dtype=np.int64)
+    n_collisions = 0
+    last_split = 0
+    for i in range(1, len(S) + 1):
+        x = S[i - 1]
+        if seen[x] > last_split:
+            C[n_collisions] = i - last_split
+            n_collisions += 1
+            last_split = i
+        else:
+            seen[x] = i
+    return C[:n_collisions]
+
+
+@_jit
+def n_runs(S_prime: np.ndarray) -> int:
+    """Determines the number of runs of identical symbols in a sequence.
+
+    Parameters
+    ----------
+    S_prime : np.ndarray
+        an input sequence processed with s_prime() or s_prime_median()
+
+    Returns
+    -------
+    int
+        number of runs in the sequence
+    """
+    T = 1
+    for i in range(1, len(S_prime)):
+        if S_prime[i] != S_prime[i - 1]:
+            T += 1
+    return T
+
+
+@_jit
+def l_runs(S_prime: np.ndarray) -> int:
+    """Determines the length of the longest run of identical symbols in a sequence.
+
+    Parameters
+    ----------
+    S_prime : np.ndarray
+        an input sequence processed with s_prime() or s_prime_median()
+
+    Returns
+    -------
+    int
+        length of the longest run in the sequence
+    """
+    T = 0
+    current_len = 1
+    for i in range(1, len(S_prime)):
+        if S_prime[i] == S_prime[i - 1]:
+            current_len += 1
+        else:
+            T = max(T, current_len)
+            current_len = 1
+    # Measure last run
+    return max(T, current_len)
+
+
+@_jit
+def _excursion(S: np.ndarray, X: float) -> float:
+    """Measures how far the running sum of sample values deviates from its average value at each point in the sequence.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    X : float
+        the average of the sequence
+
+    Returns
+    -------
+    float
+        maximum deviation from the average
+    """
+    cumulative_sum = 0
+    T = 0.0
+    for i in range(len(S)):
+        cumulative_sum += int(S[i])
+        T = max(T, abs(cumulative_sum - (i + 1) * X))
+    return T
+
+
+@_jit
+def _n_directional_runs(S: np.ndarray, S_prime: np.ndarray) -> int:
+    """Measures the number of runs constructed using the relations between consecutive samples.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime : np.ndarray
+        the s_prime(S) sequence
+
+    Returns
+    -------
+    int
+        number of runs
+    """
+    return n_runs(S_prime)
+
+
+@_jit
+def _l_directional_runs(S: np.ndarray, S_prime: np.ndarray) -> int:
+    """Measures the length of the longest run constructed using the relations between consecutive samples.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime : np.ndarray
+        the s_prime(S) sequence
+
+    Returns
+    -------
+    int
+        length of the longest run of consecutive samples that are either strictly increasing or strictly decreasing
+    """
+    return l_runs(S_prime)
+
+
+@_jit
+def _n_increases_decreases(S: np.ndarray, S_prime: np.ndarray) -> int:
+    """Measures the maximum number of increases or decreases between consecutive sample values.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime : np.ndarray
+        the s_prime(S) sequence
+
+    Returns
+    -------
+    int
+        greater number between the total counts of increases and decreases among consecutive sample values
+    """
+    count = 0
+    for i in range(len(S_prime)):
+        if S_prime[i] == 1:
+            count += 1
+    return max(count, len(S_prime) - count)
+
+
+@_jit
+def _n_median_runs(S: np.ndarray, S_prime_median: np.ndarray) -> int:
+    """Measures the number of runs that are constructed with respect to the median of the sequence.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime_median : np.ndarray
+        the s_prime_median(S) sequence
+
+    Returns
+    -------
+    int
+        number of runs
+    """
+    return n_runs(S_prime_median)
+
+
+@_jit
+def _l_median_runs(S: np.ndarray, S_prime_median: np.ndarray) -> int:
+    """Measures the length of the longest run constructed with respect to the median of the sequence.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime_median : np.ndarray
+        the s_prime_median(S) sequence
+
+    Returns
+    -------
+    int
+        length of the longest run
+    """
+    return l_runs(S_prime_median)
+
+
+@_jit
+def _avg_collision(S: np.ndarray, C: np.ndarray) -> float:
+    """Counts the number of successive sample values until a duplicate is found.
+
+    The sum of the collisions and their number are exact in float64, so their quotient is correctly rounded as
+    statistics.mean().
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    C : np.ndarray
+        the compute_collisions(S) sequence
+
+    Returns
+    -------
+    float
+        average number of samples observed to find two occurrences of the same value in the input sequence
+    """
+    if len(C) == 0:
+        raise ValueError("No collision found in the input sequence")
+    return C.sum() / len(C)
+
+
+@_jit
+def _max_collision(S: np.ndarray, C: np.ndarray) -> int:
+    """Counts the number of successive sample values until a duplicate is found.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    C : np.ndarray
+        the compute_collisions(S) sequence
+
+    Returns
+    -------
+    int
+        maximum number of samples observed to find two occurrences of the same value in the input sequence
+    """
+    if len(C) == 0:
+        raise ValueError("No collision found in the input sequence")
+    return C.max()
+
+
+@_jit
+def _periodicity(S: np.ndarray, p: int) -> int:
+    """Determines the number of periodic structures in the data.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    p : int
+        lag parameter p
+
+    Returns
+    -------
+    int
+        number of instances where an element in the sequence is equal to another element that is y positions ahead
+    """
+    T = 0
+    for i in range(len(S) - p):
+        if S[i] == S[i + p]:
+            T += 1
+    return T
+
+
+@_jit
+def _covariance(S: np.ndarray, p: int) -> int:
+    """Measures the strength of the lagged correlation.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    p : int
+        lag parameter p
+
+    Returns
+    -------
+    int
+        sum of the products of each element in the sequence with another element that is p positions ahead
+    """
+    T = 0
+    for i in range(len(S) - p):
+        T += int(S[i]) * int(S[i + p])
+    return T
+
+
+def _compression(S: np.ndarray) -> int:
+    """Measures the length of the sequence encoded into a character string and processed by a general-purpose
+    compression algorithm (bzip2).
+
+    The compressor is not compiled: the sequence is encoded and compressed by the NumPy implementation, whose bz2
+    compression releases the GIL as well.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    int
+        length of the compressed string
+    """
+    return permutation_tests_numpy._compression(S).item()
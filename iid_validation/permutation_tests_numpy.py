@@ -0,0 +1,866 @@
+import bz2
+import concurrent.futures
+import math
+import os
+import threading
+import typing
+
+import numpy as np
+
+from . import cpu
+
+# NumPy implementation of the permutation test statistics.
+# Each function mirrors its pure-Python counterpart in permutation_tests and returns numerically identical results,
+# but operates on an array of unsigned 8-bit symbols instead of a list of int.
+# The statistics are computed along the last axis, so a 2-D array tests a whole batch of sequences at once.
+
+# Upper bound on the memory used to test a batch of sequences at once
+BATCH_MEMORY_LIMIT = 256 * 1024 * 1024
+# Approximate peak memory needed to test one symbol of a batch, across all intermediate arrays
+_BATCH_BYTES_PER_SYMBOL = 32
+# Binary sequences are packed into little-endian 64-bit words
+_WORD = np.dtype("<u8")
+_ALL_BITS = np.uint64(0xFFFFFFFFFFFFFFFF)
+# Number of bits set in each byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+# Largest alphabet for which the next occurrence of each sample is found by comparing it to the following samples
+_COLLISION_MAX_OFFSETS = 32
+# Minimum number of samples for which the comparisons to the following samples, and the search of the collisions in
+# blocks, are faster than sorting the samples, and following the collisions one at a time
+_COLLISION_MIN_OFFSETS_SAMPLES = 16384
+_COLLISION_MIN_BLOCK_SAMPLES = 65536
+# Cost of the FFT-based autocorrelation of a sequence zero-padded to n_fft samples, in units of the direct computation
+# of the covariance of one lag, per n_fft * log2(n_fft) / len(S): measured between 6 and 9 for sequences of 10^5 to
+# 10^6 samples. The covariance of all lags is computed at once with the autocorrelation when it is cheaper, e.g. from
+# about 170 lags for 10^6 samples, and from about 300 lags for 6 * 10^5 samples, which are padded to 2^20.
+FFT_COST = 8
+# Upper bound on len(S) * max(S)**2 for which the rounded FFT-based autocorrelation is exact in double precision
+_FFT_EXACT_LIMIT = 2**40
+# Number of threads compressing the sequences of a batch: bz2 releases the GIL while compressing.
+# The workers of a pool share the CPUs, see set_compression_threads()
+COMPRESSION_THREADS = cpu.available_cpus()
+# Threads compressing the sequences of a batch, started on first use, and the process that started them
+_compression_executor: concurrent.futures.ThreadPoolExecutor | None = None
+_compression_executor_pid: int | None = None
+_compression_executor_lock = threading.Lock()
+
+# Lookup table of the decimal representation of each symbol value followed by a space, padded with zeros to a fixed
+# width, and the length of each representation
+_DECIMAL_WIDTH = 4
+_DECIMAL_LUT = np.array([list(f"{v} ".encode().ljust(_DECIMAL_WIDTH, b"\0")) for v in range(256)], dtype=np.uint8)
+_DECIMAL_LEN = np.array([len(f"{v} ") for v in range(256)], dtype=np.uint8)
+
+
+# A sequence of bits packed with pack_bits(), and its length in bits
+PackedBits = typing.NamedTuple("PackedBits", [("words", np.ndarray), ("length", int)])
+
+
+def as_array(S: list[int] | np.ndarray) -> np.ndarray:
+    """Converts a sequence of symbols to the array representation used by this module.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    np.ndarray
+        sequence of sample values as an array of uint8
+    """
+    return np.asarray(S, dtype=np.uint8)
+
+
+def max_batch_size(n_symbols: int) -> int:
+    """Returns the largest number of sequences that can be tested at once within BATCH_MEMORY_LIMIT.
+
+    Parameters
+    ----------
+    n_symbols : int
+        number of symbols in each sequence
+
+    Returns
+    -------
+    int
+        maximum batch size, at least 1
+    """
+    return max(1, BATCH_MEMORY_LIMIT // (_BATCH_BYTES_PER_SYMBOL * n_symbols))
+
+
+def generator(seed_sequence: np.random.SeedSequence) -> np.random.Generator:
+    """Creates a random generator from a seed sequence, using the counter-based Philox bit generator.
+
+    Parameters
+    ----------
+    seed_sequence : np.random.SeedSequence
+        the seed of the random stream
+
+    Returns
+    -------
+    np.random.Generator
+        the random generator
+    """
+    return np.random.Generator(np.random.Philox(seed_sequence))
+
+
+def FY_shuffle(S: np.ndarray, rng: np.random.Generator | None = None) -> np.ndarray:
+    """Shuffles a sequence in place using the Fisher-Yates algorithm.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    rng : np.random.Generator | None
+        the random generator to use, a freshly seeded one if None
+
+    Returns
+    -------
+    np.ndarray
+        shuffled sequence
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    rng.shuffle(S)
+    return S
+
+
+def FY_shuffle_batch(S: np.ndarray, rngs: list[np.random.Generator], out: np.ndarray | None = None) -> np.ndarray:
+    """Generates a batch of independent shuffles of a sequence using the Fisher-Yates algorithm.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    rngs : list of np.random.Generator
+        the random generator of each shuffled sequence
+    out : np.ndarray | None
+        a 2-D array of shape (len(rngs), len(S)) to reuse for the batch
+
+    Returns
+    -------
+    np.ndarray
+        2-D array of shape (len(rngs), len(S)), with one shuffled sequence per row
+    """
+    if out is None:
+        S_batch = np.tile(S, (len(rngs), 1))
+    else:
+        S_batch = out
+        S_batch[:] = S
+    for row, rng in zip(S_batch, rngs):
+        rng.shuffle(row)
+    return S_batch
+
+
+def pack_bits(B: np.ndarray) -> PackedBits:
+    """Packs a sequence of bits into 64-bit words, along the last axis.
+
+    Bit i of the sequence is stored in bit i % 64 of word i // 64, and the bits after the end of the sequence are 0.
+
+    Parameters
+    ----------
+    B : np.ndarray
+        sequence of booleans
+
+    Returns
+    -------
+    PackedBits
+        packed sequence
+    """
+    n = B.shape[-1]
+    packed = np.packbits(B, axis=-1, bitorder="little")
+    words = np.zeros(B.shape[:-1] + (-(-n // 64) * 8,), dtype=np.uint8)
+    words[..., : packed.shape[-1]] = packed
+    return PackedBits(words.view(_WORD), n)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Counts the bits set in an array of 64-bit words, along the last axis.
+
+    Parameters
+    ----------
+    words : np.ndarray
+        array of words
+
+    Returns
+    -------
+    np.ndarray
+        number of bits set
+    """
+    return np.sum(_POPCOUNT[words.view(np.uint8)], axis=-1, dtype=np.int64)
+
+
+def _low_bits(n_bits: int, n_words: int) -> np.ndarray:
+    """Returns n_words words with the n_bits lowest bits set."""
+    words = np.zeros(n_words, dtype=_WORD)
+    words[: n_bits // 64] = _ALL_BITS
+    if n_bits % 64:
+        words[n_bits // 64] = (np.uint64(1) << np.uint64(n_bits % 64)) - np.uint64(1)
+    return words
+
+
+def _shift_bits(words: np.ndarray, s: int) -> np.ndarray:
+    """Shifts packed sequences of bits by s positions towards their start: bit i of the result is bit i + s."""
+    q, r = divmod(s, 64)
+    shifted = np.zeros_like(words)
+    if q < words.shape[-1]:
+        shifted[..., : words.shape[-1] - q] = words[..., q:]
+    if r:
+        carry = np.zeros_like(shifted)
+        carry[..., :-1] = shifted[..., 1:] << np.uint64(64 - r)
+        shifted >>= np.uint64(r)
+        shifted |= carry
+    return shifted
+
+
+def _longest_ones(words: np.ndarray) -> np.ndarray:
+    """Determines the length of the longest run of bits set in packed sequences of bits.
+
+    Level k of a doubling table marks the positions starting 2**k consecutive bits set. The longest run is then found
+    by binary lifting from the highest non-empty level, shifting together the sequences with the same partial length.
+    """
+    levels = [words.reshape(-1, words.shape[-1])]
+    while np.any(levels[-1]):
+        levels.append(levels[-1] & _shift_bits(levels[-1], 1 << (len(levels) - 1)))
+
+    longest = np.zeros(levels[0].shape[0], dtype=np.int64)
+    # Positions starting a run of at least longest bits set
+    starts = np.full_like(levels[0], _ALL_BITS)
+    for k in reversed(range(len(levels) - 1)):
+        for length in np.unique(longest):
+            rows = np.flatnonzero(longest == length)
+            candidates = starts[rows] & _shift_bits(levels[k][rows], int(length))
+            found = np.any(candidates, axis=-1)
+            starts[rows[found]] = candidates[found]
+            longest[rows[found]] += 1 << k
+    return longest.reshape(words.shape[:-1])
+
+
+def s_prime(S: np.ndarray) -> PackedBits:
+    """Generates a transformed sequence based on the comparison of consecutive elements in the input sequence.
+    For each pair of consecutive elements, if the first element is greater than the second, a -1
+    is stored in the new sequence; otherwise, a +1 is stored.
+
+    The sequence is packed, with a bit set for each +1.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    PackedBits
+        new sequence of -1s and +1s
+    """
+    if S.shape[-1] == 0:
+        raise Exception("Input sequence has length 0")
+    if S.shape[-1] == 1:
+        raise Exception("Input sequence has length 1")
+
+    return pack_bits(S[..., :-1] <= S[..., 1:])
+
+
+def s_prime_median(S: np.ndarray, M: float | None = None) -> PackedBits:
+    """Generates a transformed sequence where each original value is replaced with -1 if it is less than the median of
+    the original sequence, or 1 if it is greater than or equal to the median.
+
+    Accepts a pre-computed median value, if provided. The sequence is packed, with a bit set for each +1.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    M: float
+        the pre-computed median of the sequence
+
+    Returns
+    -------
+    PackedBits
+        new sequence of -1s and +1s
+    """
+    if S.shape[-1] == 0:
+        raise Exception("Input sequence has length 0")
+
+    if M is None:
+        M = np.median(S, axis=-1, keepdims=True)
+
+    return pack_bits(S >= M)
+
+
+def next_occurrence(S: np.ndarray) -> np.ndarray:
+    """Finds the index of the next occurrence of the value of each sample, among the samples that can complete a
+    collision.
+
+    With an alphabet of K values, any K + 1 consecutive samples contain a duplicate, so a collision never spans more
+    than K + 1 samples. For small alphabets, each sample is compared to the K following ones, and the next occurrences
+    farther than K samples, which cannot complete a collision, are reported as missing. For large alphabets or short
+    sequences, the next occurrences are found by sorting.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    np.ndarray
+        index of the next occurrence of each sample value, len(S) if there is none
+    """
+    n = S.shape[-1]
+    alphabet_size = int(S.max(initial=0)) + 1
+    if alphabet_size <= _COLLISION_MAX_OFFSETS and S.size >= _COLLISION_MIN_OFFSETS_SAMPLES:
+        # Distance to the next occurrence within the alphabet size, 0 if there is none: the comparisons at decreasing
+        # offsets overwrite the distance of each matching sample, which ends with the smallest one
+        distance = np.zeros(S.shape, dtype=np.uint8)
+        for d in range(min(alphabet_size, n - 1), 0, -1):
+            match = (S[..., :-d] == S[..., d:]).view(np.uint8)
+            following = distance[..., :-d]
+            following -= match * (following - np.uint8(d))
+        return np.where(distance == 0, n, np.arange(n, dtype=np.int32) + distance)
+
+    order = np.argsort(S, axis=-1, kind="stable")
+    next_index = np.full(S.shape, n, dtype=np.int32)
+    if S.ndim == 1:
+        same = S[order[1:]] == S[order[:-1]]
+        next_index[order[:-1][same]] = order[1:][same]
+        return next_index
+    S_sorted = np.take_along_axis(S, order, axis=-1)
+    same = S_sorted[..., 1:] == S_sorted[..., :-1]
+    np.put_along_axis(next_index, order[..., :-1], np.where(same, order[..., 1:], n).astype(np.int32), axis=-1)
+    return next_index
+
+
+def compute_collisions(S: np.ndarray) -> np.ndarray:
+    """Finds the positions where a duplicate is found, counting successive sample values from the previous duplicate.
+
+    The search for a duplicate starting at each index ends at the first index closing a pair opened at or after it.
+    The searches actually performed form a chain from the start of the sequence, each starting after the end of the
+    previous one. Small inputs follow the chain directly. Larger inputs, including batches, are split in blocks, and
+    the chains from the start of every block are followed at once; the chain entering each block usually merges into
+    the chain of the block within a few steps, after which they are identical.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    np.ndarray
+        boolean mask of the same shape as S, True at the samples which complete a collision
+    """
+    S_rows = S.reshape(-1, S.shape[-1])
+    n_rows, n = S_rows.shape
+    # Index where the search for a duplicate starting at each index ends, n if there is none
+    end = np.minimum.accumulate(next_occurrence(S).reshape(n_rows, n)[:, ::-1], axis=-1)[:, ::-1]
+    C = np.zeros((n_rows, n), dtype=bool)
+
+    if S.size < _COLLISION_MIN_BLOCK_SAMPLES:
+        for row, row_end in enumerate(end.tolist()):
+            boundaries = []
+            start = 0
+            while start < n and row_end[start] < n:
+                boundaries.append(row_end[start])
+                start = row_end[start] + 1
+            C[row, boundaries] = True
+        return C.reshape(S.shape)
+
+    # Start of the next search after each start index, with the rows laid out one after the other with an extra index
+    # at the end of each row, where the chain of the row terminates
+    stride = n + 1
+    row_offset = np.arange(n_rows, dtype=np.int64)[:, np.newaxis] * stride
+    next_start = np.empty((n_rows, stride), dtype=np.int64)
+    next_start[:, :n] = np.minimum(end, n - 1) + 1 + row_offset
+    next_start[:, n] = row_offset[:, 0] + n
+    next_start = next_start.ravel()
+    # Balance the number of blocks, followed one by one, with the number of steps within a block, followed at once.
+    # A collision spans about sqrt(pi * K / 2) samples for an alphabet of K values.
+    mean_step = 2 + math.sqrt(math.pi * (int(S.max(initial=0)) + 1) / 2)
+    block_len = max(16, math.isqrt(int(S.size * mean_step)))
+    block_start = (row_offset + np.arange(0, n, block_len)).ravel()
+    block_stop = (row_offset + np.minimum(np.arange(0, n, block_len) + block_len, n)).ravel()
+
+    # Follow the chain from the start of each block up to the first start in the following blocks
+    on_chain = np.zeros(n_rows * stride, dtype=bool)
+    block_exit = block_start.copy()
+    active = np.arange(len(block_start))
+    while len(active):
+        position = block_exit[active]
+        on_chain[position] = True
+        block_exit[active] = next_start[position]
+        active = active[block_exit[active] < block_stop[active]]
+
+    # Follow the actual chain of each row, from the start of the row, until it merges into the chain of each block
+    n_blocks = len(block_start) // n_rows
+    for row in range(n_rows):
+        start = row * stride
+        for block in range(row * n_blocks, (row + 1) * n_blocks):
+            entry = int(block_start[block])
+            stop = int(block_stop[block])
+            not_merged = []
+            while start < stop and not on_chain[start]:
+                not_merged.append(start)
+                start = int(next_start[start])
+            # The starts of the block chain before the merge, if any, are not on the actual chain
+            on_chain[entry:start] = False
+            on_chain[not_merged] = True
+            if start < stop:
+                start = int(block_exit[block])
+
+    rows, starts = np.nonzero(on_chain.reshape(n_rows, stride)[:, :n] & (end < n))
+    C[rows, end[rows, starts]] = True
+    return C.reshape(S.shape)
+
+
+def n_runs(S_prime: PackedBits) -> np.ndarray:
+    """Determines the number of runs of identical symbols in a sequence.
+
+    Assumes a sequence of length > 0. Each run but the last ends where a bit differs from the following one.
+
+    Parameters
+    ----------
+    S_prime : PackedBits
+        an input sequence processed with s_prime() or s_prime_median()
+
+    Returns
+    -------
+    np.ndarray
+        number of runs in the sequence
+    """
+    words = S_prime.words
+    changes = (words ^ _shift_bits(words, 1)) & _low_bits(S_prime.length - 1, words.shape[-1])
+    return 1 + popcount(changes)
+
+
+def l_runs(S_prime: PackedBits) -> np.ndarray:
+    """Determines the length of the longest run of identical symbols in a sequence.
+
+    Assumes a sequence of length > 0.
+
+    Parameters
+    ----------
+    S_prime : PackedBits
+        an input sequence processed with s_prime() or s_prime_median()
+
+    Returns
+    -------
+    np.ndarray
+        length of the longest run in the sequence
+    """
+    words = S_prime.words
+    complement = ~words & _low_bits(S_prime.length, words.shape[-1])
+    return np.maximum(_longest_ones(words), _longest_ones(complement))
+
+
+def _excursion(S: np.ndarray, X: float | None = None) -> np.ndarray:
+    """Measures how far the running sum of sample values deviates from its average value at each point in the sequence.
+
+    Accepts a pre-computed average value, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    X : float
+        the pre-computed average of the sequence
+
+    Returns
+    -------
+    np.ndarray
+        maximum deviation from the average
+    """
+    n = S.shape[-1]
+    if X is None:
+        X = np.sum(S, axis=-1, dtype=np.int64, keepdims=True) / n
+
+    D = np.abs(np.cumsum(S, axis=-1, dtype=np.int64) - np.arange(1, n + 1) * X)
+    return np.max(D, axis=-1)
+
+
+def _n_directional_runs(S: np.ndarray, S_prime: PackedBits | None = None) -> np.ndarray:
+    """Measures the number of runs constructed using the relations between consecutive samples.
+
+    Accepts a pre-computed S_prime sequence, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime: np.ndarray
+        the pre-computed s_prime(S) sequence
+
+    Returns
+    -------
+    np.ndarray
+        number of runs
+    """
+    if S_prime is None:
+        S_prime = s_prime(S)
+
+    return n_runs(S_prime)
+
+
+def _l_directional_runs(S: np.ndarray, S_prime: PackedBits | None = None) -> np.ndarray:
+    """Measures the length of the longest run constructed using the relations between consecutive samples.
+
+    Accepts a pre-computed S_prime sequence, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime: np.ndarray
+        the pre-computed s_prime(S) sequence
+
+    Returns
+    -------
+    np.ndarray
+        length of the longest run of consecutive samples that are either strictly increasing or strictly decreasing
+    """
+    if S_prime is None:
+        S_prime = s_prime(S)
+
+    return l_runs(S_prime)
+
+
+def _n_increases_decreases(S: np.ndarray, S_prime: PackedBits | None = None) -> np.ndarray:
+    """Measures the maximum number of increases or decreases between consecutive sample values.
+
+    Accepts a pre-computed S_prime sequence, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime: np.ndarray
+        the pre-computed s_prime(S) sequence
+
+    Returns
+    -------
+    np.ndarray
+        greater number between the total counts of increases and decreases among consecutive sample values
+    """
+    if S_prime is None:
+        S_prime = s_prime(S)
+
+    count = popcount(S_prime.words)
+
+    return np.maximum(count, S_prime.length - count)
+
+
+def _n_median_runs(S: np.ndarray, S_prime_median: PackedBits | None = None) -> np.ndarray:
+    """Measures the number of runs that are constructed with respect to the median of the sequence.
+
+    Accepts a pre-computed S_prime_median sequence, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime_median: np.ndarray
+        the pre-computed s_prime_median(S) sequence
+
+    Returns
+    -------
+    np.ndarray
+        number of runs
+    """
+    if S_prime_median is None:
+        S_prime_median = s_prime_median(S)
+
+    return n_runs(S_prime_median)
+
+
+def _l_median_runs(S: np.ndarray, S_prime_median: PackedBits | None = None) -> np.ndarray:
+    """Measures the length of the longest run constructed with respect to the median of the sequence.
+
+    Accepts a pre-computed S_prime_median sequence, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    S_prime_median: np.ndarray
+        the pre-computed s_prime_median(S) sequence
+
+    Returns
+    -------
+    np.ndarray
+        length of the longest run
+    """
+    if S_prime_median is None:
+        S_prime_median = s_prime_median(S)
+
+    return l_runs(S_prime_median)
+
+
+def _avg_collision(S: np.ndarray, C: np.ndarray | None = None) -> np.ndarray:
+    """Counts the number of successive sample values until a duplicate is found.
+
+    Accepts a pre-computed mask of collisions C calculated on the sequence S, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    C: np.ndarray
+        mask of the samples which complete a collision, as returned by compute_collisions()
+
+    Returns
+    -------
+    np.ndarray
+        average number of samples observed to find two occurrences of the same value in the input sequence
+    """
+    if C is None:
+        C = compute_collisions(S)
+    count = np.count_nonzero(C, axis=-1)
+    if np.any(count == 0):
+        raise ValueError("No collision found in the input sequence")
+    # The collisions span the sequence up to the last one found
+    total = C.shape[-1] - np.argmax(C[..., ::-1], axis=-1)
+    # Integer division operands are exact in double precision, so the mean is correctly rounded as in statistics.mean()
+    return total / count
+
+
+def _max_collision(S: np.ndarray, C: np.ndarray | None = None) -> np.ndarray:
+    """Counts the number of successive sample values until a duplicate is found.
+
+    Accepts a pre-computed mask of collisions C calculated on the sequence S, if provided.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    C: np.ndarray
+        mask of the samples which complete a collision, as returned by compute_collisions()
+
+    Returns
+    -------
+    np.ndarray
+        maximum number of samples observed to find two occurrences of the same value in the input sequence
+    """
+    if C is None:
+        C = compute_collisions(S)
+    if not np.all(np.any(C, axis=-1)):
+        raise ValueError("No collision found in the input sequence")
+    index = np.arange(C.shape[-1], dtype=np.int32)
+    # Index of the last collision found before each sample, -1 if there is none
+    last = np.maximum.accumulate(np.where(C, index, -1), axis=-1)
+    previous = np.concatenate((np.full(C.shape[:-1] + (1,), -1, dtype=np.int32), last[..., :-1]), axis=-1)
+    return np.max(np.where(C, index - previous, 0), axis=-1)
+
+
+def _periodicity(S: np.ndarray, p: int) -> np.ndarray:
+    """Determines the number of periodic samples in the sequence.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    p : int
+        lag parameter
+
+    Returns
+    -------
+    np.ndarray
+        number of instances where an element in the sequence is equal to another element that is y positions ahead
+    """
+    return periodicity_lags(S, [p])[..., 0]
+
+
+def _covariance(S: np.ndarray, p: int) -> np.ndarray:
+    """Measures the strength of the lagged correlation.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    p : int
+        lag parameter p
+
+    Returns
+    -------
+    np.ndarray
+        sum of the products of each element in the sequence with another element that is p positions ahead
+    """
+    return covariance_lags(S, [p])[..., 0]
+
+
+def periodicity_lags(S: np.ndarray, lags: list[int]) -> np.ndarray:
+    """Determines the number of periodic samples in the sequence for each lag parameter.
+
+    Each lag is a single comparison pass over the symbols, which is cheaper than the FFT-based autocorrelation of the
+    indicator sequence of each symbol value for any practical number of lags.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    lags : list of int
+        lag parameters
+
+    Returns
+    -------
+    np.ndarray
+        number of periodic samples, with the lags along the last axis
+    """
+    return np.stack([np.count_nonzero(S[..., :-p] == S[..., p:], axis=-1) for p in lags], axis=-1)
+
+
+def covariance_lags(S: np.ndarray, lags: list[int]) -> np.ndarray:
+    """Measures the strength of the lagged correlation for each lag parameter.
+
+    The sums of products are computed in double precision, where they are exact integers. With enough lags for it to
+    be cheaper (see FFT_COST), all of them are obtained from a single FFT-based autocorrelation of the sequence,
+    rounded to the exact integer values.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+    lags : list of int
+        lag parameters
+
+    Returns
+    -------
+    np.ndarray
+        sums of the products of each element with another element that is p positions ahead, with the lags along the
+        last axis
+    """
+    X = S.astype(np.float64)
+    n_fft = fft_length(S.shape[-1], max(lags))
+    if (
+        len(lags) * S.shape[-1] > FFT_COST * n_fft * math.log2(n_fft)
+        and S.shape[-1] * float(S.max(initial=0)) ** 2 < _FFT_EXACT_LIMIT
+    ):
+        C = autocorrelation(X, max(lags))[..., lags]
+    else:
+        C = np.stack([np.einsum("...i,...i->...", X[..., :-p], X[..., p:]) for p in lags], axis=-1)
+    return np.rint(C).astype(np.int64)
+
+
+def fft_length(n: int, max_lag: int) -> int:
+    """Returns the length of the FFT of the autocorrelation of a sequence, for the lags from 0 to max_lag.
+
+    The sequence is zero-padded to a power of two, so the circular correlation does not wrap around up to max_lag.
+
+    Parameters
+    ----------
+    n : int
+        length of the sequence
+    max_lag : int
+        largest lag to compute
+
+    Returns
+    -------
+    int
+        length of the FFT
+    """
+    return 1 << (n + max_lag - 1).bit_length()
+
+
+def autocorrelation(X: np.ndarray, max_lag: int) -> np.ndarray:
+    """Computes the (non-normalized) autocorrelation of a sequence with an FFT, for the lags from 0 to max_lag.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        sequence of values
+    max_lag : int
+        largest lag to compute
+
+    Returns
+    -------
+    np.ndarray
+        sum of the products of each element with another element that is p positions ahead, for p from 0 to max_lag,
+        along the last axis
+    """
+    n_fft = fft_length(X.shape[-1], max_lag)
+    F = np.fft.rfft(X, n_fft, axis=-1)
+    return np.fft.irfft(F.real**2 + F.imag**2, n_fft, axis=-1)[..., : max_lag + 1]
+
+
+def encode_decimal(S: np.ndarray) -> bytes:
+    """Encodes a sequence into the string of its decimal values separated by a single space, without converting each
+    value to a str.
+
+    The result is identical to " ".join(map(str, S)).encode("utf-8").
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    bytes
+        encoded sequence
+    """
+    if S.shape[-1] == 0:
+        return b""
+    # Keep the significant bytes of the padded representation of each value, and drop the trailing space
+    mask = np.arange(_DECIMAL_WIDTH) < _DECIMAL_LEN[S][:, np.newaxis]
+    return _DECIMAL_LUT[S][mask].tobytes()[:-1]
+
+
+def set_compression_threads(threads: int) -> None:
+    """Sets the number of threads compressing the sequences of a batch, e.g. to the share of the CPUs of each worker of
+    a pool. The current threads, if any, are stopped once they are done.
+
+    Parameters
+    ----------
+    threads : int
+        number of threads, at least 1
+    """
+    global COMPRESSION_THREADS, _compression_executor
+    with _compression_executor_lock:
+        COMPRESSION_THREADS = max(1, threads)
+        if _compression_executor is not None:
+            _compression_executor.shutdown(wait=False)
+            _compression_executor = None
+
+
+def compression_executor() -> concurrent.futures.ThreadPoolExecutor | None:
+    """Returns the threads compressing the sequences of a batch, started on the first call in each process, as the
+    threads of a parent process do not exist in the processes forked from it.
+
+    Returns
+    -------
+    concurrent.futures.ThreadPoolExecutor | None
+        the compression threads, None if COMPRESSION_THREADS is 1
+    """
+    global _compression_executor, _compression_executor_pid
+    if COMPRESSION_THREADS == 1:
+        return None
+    with _compression_executor_lock:
+        if _compression_executor is None or _compression_executor_pid != os.getpid():
+            _compression_executor = concurrent.futures.ThreadPoolExecutor(
+                COMPRESSION_THREADS, thread_name_prefix="compression"
+            )
+            _compression_executor_pid = os.getpid()
+        return _compression_executor
+
+
+def _compression(S: np.ndarray) -> np.ndarray:
+    """Measures the length of the sequence encoded into a character string and processed by a general-purpose
+    compression algorithm (bzip2).
+
+    The sequence is encoded as a list of its values separated by a single space.
+
+    Parameters
+    ----------
+    S : np.ndarray
+        sequence of sample values
+
+    Returns
+    -------
+    np.ndarray
+        length of the compressed string
+    """
+    if S.ndim > 1:
+        executor = compression_executor() if len(S) > 1 else None
+        return np.array(list(executor.map(_compression, S) if executor else map(_compression, S)))
+
+    # Select compresslevel=5 to make results numerically identical to NIST implementation
+    t = bz2.compress(encode_decimal(S), compresslevel=5)
+    return np.array(len(t))
@@ -8,16 +8,28 @@ import numpy as np
 from . import permutation_tests
 
 
-def histogram_TxTi(Tx: float, Ti: list[float], test_label: str, test_isint: bool, plot_dir_h: str) -> None:
-    """Plots tests values in an histogram (with binning made such that bins are centered on an integer)
-    with the red vertical line as the reference value Tx.
+def histogram_TxTi(
+    Tx: float,
+    Ti: permutation_tests.Histogram,
+    Ti_mean: float,
+    Ti_stdev: float | None,
+    test_label: str,
+    test_isint: bool,
+    plot_dir_h: str,
+) -> None:
+    """Plots tests values in an histogram (with binning made such that the bins of an integer test hold whole integers,
+    centered in the bins of width 1) with the red vertical line as the reference value Tx.
 
     Parameters
     ----------
     Tx : float
         Tx test values calculated on one sequence
-    Ti : list of float
-        Ti test values calculated on the shuffled sequences
+    Ti : permutation_tests.Histogram
+        histogram of the Ti test values calculated on the shuffled sequences
+    Ti_mean : float
+        mean of the Ti test values
+    Ti_stdev : float | None
+        standard deviation of the Ti test values, None if it is not defined
     test_label : str
         test executed
     test_isint: bool
@@ -27,26 +39,24 @@ def histogram_TxTi(Tx: float, Ti: list[float], test_label: str, test_isint: bool
     """
     fig, ax = plt.subplots()
 
-    # Creating bins for histogram
-    n_bins = 30
-    bin_width = (-min(Ti) + 0.5 + max(Ti) + 1.5) / n_bins
     # if the data is int, consider an integer number of values for each bin to avoid binning artifacts
-    if test_isint:
-        bin_width = math.ceil(bin_width)
-    bin_edges = list(np.arange(min(Ti) - 0.5, max(Ti) + 1.5, bin_width))
-    # as np.arange considers an half open interval [start, stop), check if the last bin edge covers the maximum of Ti
-    # and add another bin edge to the right if necessary
-    if bin_edges[-1] < max(Ti):
-        bin_edges.append(bin_edges[-1] + bin_width)
+    if test_isint and Ti.width < 1:
+        Ti = permutation_tests.Histogram(Ti.level, Ti.low, Ti.counts)
+        Ti.coarsen(-round(math.log2(permutation_tests.HISTOGRAM_RESOLUTION)))
+    # Only the bins between the first and the last non-empty ones are shown
+    filled = np.flatnonzero(Ti.counts)
+    first, last = filled[0], filled[-1] + 1
+    bin_edges = Ti.edges()[first : last + 1]
     # Plotting histogram for Ti
-    ax.hist(Ti, bins=bin_edges, color="skyblue", edgecolor="black")
+    ax.hist(bin_edges[:-1], bins=bin_edges, weights=Ti.counts[first:last], color="skyblue", edgecolor="black")
     # Adding a vertical line for Tx
     reference_label = "Reference Value: " + (f"{Tx}" if test_isint else f"{Tx:.2f}")
     ax.axvline(x=Tx, color="red", label=reference_label)
 
     # Preparing text string for mean and std
-    textstr = rf"""$\mu={statistics.mean(Ti):.2f}$
-$\sigma={statistics.stdev(Ti):.2f}$"""
+    textstr = rf"$\mu={Ti_mean:.2f}$"
+    if Ti_stdev is not None:
+        textstr += "\n" + rf"$\sigma={Ti_stdev:.2f}$"
 
     # Text box properties
     props = dict(boxstyle="round", facecolor="wheat", alpha=0.5)
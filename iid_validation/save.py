@@ -7,6 +7,8 @@ import pathlib
 import struct
 from datetime import datetime
 
+import numpy as np
+
 from . import permutation_tests
 
 # Configure per-module logger
@@ -48,7 +50,7 @@ def save_counters(
     selected_tests: list[int],
     C0: list[int],
     C1: list[int],
-    b: bool,
+    b: bool | None,
     test_time: float,
     dir_path: str = "",
 ) -> None:
@@ -66,8 +68,8 @@ def save_counters(
         counter C0
     C1 : list of int
         counter C1
-    b : bool
-        IID assumption
+    b : bool | None
+        IID assumption, None if it is not decided (e.g. counters of an interrupted run)
     test_time : float
         total process time
     dir_path: str
@@ -92,6 +94,44 @@ def save_counters(
     _save_data_helper(f, header, [d])
 
 
+def save_checkpoint(file: str, checkpoint: dict) -> None:
+    """Saves a checkpoint of a run to a JSON file.
+
+    The checkpoint is written to a temporary file first, then moved in place, so that an interrupted write does not
+    corrupt the previous checkpoint.
+
+    Parameters
+    ----------
+    file : str
+        the checkpoint file
+    checkpoint : dict
+        JSON-serializable checkpoint data
+    """
+    tmp_file = f"{file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, file)
+
+
+def load_checkpoint(file: str) -> dict:
+    """Loads a checkpoint saved by save_checkpoint().
+
+    Parameters
+    ----------
+    file : str
+        the checkpoint file
+
+    Returns
+    -------
+    dict
+        checkpoint data
+    """
+    with open(file, encoding="utf-8") as f:
+        return json.load(f)
+
+
 def save_entropy(
     file: str, symbols_occurrences: dict, n_symbols: int, H_min: float, H_min_sigma: float, H_min_NIST: float
 ):
@@ -140,11 +180,40 @@ class TestResults:
         """The binary representation of a test result."""
 
         # Header
+        # 4 bytes       : format identifier
+        # unsigned short: format version
+        # unsigned short: flags
+        # unsigned int  : length of Ti
+        # unsigned int  : bitmask of selected tests
+        # unsigned int  : number of p parameters
+        _header_fmt = "=4sHHIII"
+        _header_size = struct.calcsize(_header_fmt)
+        _magic = b"IIDT"
+        _version = 3
+
+        # Flag set once all the test results of the run are written
+        _flag_complete = 0x1
+
+        # Header of version 2, without flags
+        # 4 bytes       : format identifier
+        # unsigned short: format version
+        # unsigned int  : length of Ti
+        # unsigned int  : bitmask of selected tests
+        # unsigned int  : number of p parameters
+        _header_v2_fmt = "=4sHIII"
+        _header_v2_size = struct.calcsize(_header_v2_fmt)
+
+        # Header of version 1, without format identifier and version
         # unsigned int : length of Ti
         # unsigned int : bitmask of selected tests
         # unsigned char: number of p parameters
-        _header_fmt = "=IIB"
-        _header_size = struct.calcsize(_header_fmt)
+        _header_v1_fmt = "=IIB"
+        _header_v1_size = struct.calcsize(_header_v1_fmt)
+
+        # Entry field of a test result, by type of the results of the test
+        # double      : float results
+        # unsigned int: int results
+        _entry_fields = {float: "d", int: "I"}
 
         @staticmethod
         def header_format_size() -> tuple[str, int]:
@@ -157,6 +226,65 @@ class TestResults:
             """
             return __class__._header_fmt, __class__._header_size
 
+        @staticmethod
+        def pack_header(len_Ti: int, selected_tests_bitmask: int, len_p: int, complete: bool = True) -> bytes:
+            """Pack the header of the current format version.
+
+            Parameters
+            ----------
+            len_Ti : int
+                The length of Ti
+            selected_tests_bitmask : int
+                The bitmask of the selected tests
+            len_p : int
+                The number of p parameters
+            complete : bool
+                Whether Ti holds all the test results of the run
+
+            Returns
+            -------
+            bytes
+                The packed header
+            """
+            flags = __class__._flag_complete if complete else 0
+            return struct.pack(
+                __class__._header_fmt,
+                __class__._magic,
+                __class__._version,
+                flags,
+                len_Ti,
+                selected_tests_bitmask,
+                len_p,
+            )
+
+        @staticmethod
+        def unpack_header(b: bytes) -> tuple[tuple[int, int, int], bool, int]:
+            """Unpack the header of any format version.
+
+            The formats older than version 3 do not record whether Ti is complete, and are read as complete.
+
+            Parameters
+            ----------
+            b : bytes
+                The byte string starting with the header
+
+            Returns
+            -------
+            tuple[tuple[int, int, int], bool, int]
+                The length of Ti, the bitmask of the selected tests and the number of p parameters, whether Ti holds
+                all the test results of the run, and the size in bytes of the header.
+            """
+            if b[: len(__class__._magic)] != __class__._magic:
+                return struct.unpack_from(__class__._header_v1_fmt, b), True, __class__._header_v1_size
+            (version,) = struct.unpack_from("=H", b, len(__class__._magic))
+            if version > __class__._version:
+                raise ValueError(f"Unsupported test results format version {version}")
+            if version == 2:
+                _, _, *header = struct.unpack_from(__class__._header_v2_fmt, b)
+                return tuple(header), True, __class__._header_v2_size
+            _, _, flags, *header = struct.unpack_from(__class__._header_fmt, b)
+            return tuple(header), bool(flags & __class__._flag_complete), __class__._header_size
+
         @staticmethod
         def p_format_size(len_p: int) -> tuple[str, int]:
             """Return the format string and size of p.
@@ -191,45 +319,68 @@ class TestResults:
             tuple[str, int]
                 The format string and size in bytes of the test result entry.
             """
-            # Build a test result entry depending on the selected tests
-            #        double      : excursion result
-            #        unsigned int: n_directional_runs result
-            #        unsigned int: l_directional_runs result
-            #        unsigned int: n_increases_decreases result
-            #        unsigned int: n_median_runs result
-            #        unsigned int: l_median_runs result
-            #        double      : avg_collision result
-            #        unsigned int: max_collision result
-            # len(p) unsigned int: periodicity results for each p
-            # len(p) unsigned int: covariance results for each p
-            #        unsigned int: compression result
-            entry_fmt = "="
-            if permutation_tests.excursion.id in selected_tests:
-                entry_fmt += "d"
-            if permutation_tests.n_directional_runs.id in selected_tests:
-                entry_fmt += "I"
-            if permutation_tests.l_directional_runs.id in selected_tests:
-                entry_fmt += "I"
-            if permutation_tests.n_increases_decreases.id in selected_tests:
-                entry_fmt += "I"
-            if permutation_tests.n_median_runs.id in selected_tests:
-                entry_fmt += "I"
-            if permutation_tests.l_median_runs.id in selected_tests:
-                entry_fmt += "I"
-            if permutation_tests.avg_collision.id in selected_tests:
-                entry_fmt += "d"
-            if permutation_tests.max_collision.id in selected_tests:
-                entry_fmt += "I"
-            if permutation_tests.periodicity.id in selected_tests:
-                entry_fmt += "I" * len(p)
-            if permutation_tests.covariance.id in selected_tests:
-                entry_fmt += "I" * len(p)
-            if permutation_tests.compression.id in selected_tests:
-                entry_fmt += "I"
+            # Build a test result entry depending on the selected tests, with one field per result in the order of the
+            # test plan, e.g. len(p) fields for the periodicity results
+            plan = permutation_tests.plan_tests(selected_tests, p)
+            entry_fmt = "=" + "".join(__class__._entry_fields[t] for t in plan.result_types)
 
             entry_size = struct.calcsize(entry_fmt)
             return entry_fmt, entry_size
 
+        @staticmethod
+        def entry_dtype(selected_tests: list[int], p: list[int]) -> np.dtype:
+            """Compute the NumPy structured data type of an entry, with the packed layout of entry_format_size().
+
+            Parameters
+            ----------
+            selected_tests : list[int]
+                The selected tests in the test result entry
+            p : list[int]
+                The lag parameters p used to obtain the test result entry
+
+            Returns
+            -------
+            np.dtype
+                The data type of the test result entry, with one field per test result.
+            """
+            entry_fmt, _ = __class__.entry_format_size(selected_tests, p)
+            field_types = {"d": "=f8", "I": "=u4"}
+            return np.dtype([(f"t{i}", field_types[c]) for i, c in enumerate(entry_fmt[1:])])
+
+        @staticmethod
+        def pack_entries(entry_dtype: np.dtype, Ti: list[list[float]] | np.ndarray) -> bytes:
+            """Pack a block of test result entries at once.
+
+            Parameters
+            ----------
+            entry_dtype : np.dtype
+                The data type of an entry, as returned by entry_dtype()
+            Ti : list[list[float]] | np.ndarray
+                A list of test result lists, or an array with one row of test results per entry
+
+            Returns
+            -------
+            bytes
+                The packed entries
+
+            Raises
+            ------
+            ValueError
+                If a test result does not fit in the integer field of its entry
+            """
+            Ti = np.asarray(Ti, dtype=np.float64).reshape(len(Ti), len(entry_dtype.names))
+            entries = np.empty(len(Ti), dtype=entry_dtype)
+            for i, name in enumerate(entry_dtype.names):
+                field_type = entry_dtype.fields[name][0]
+                # The cast of a float to an integer type wraps around instead of failing as struct.pack() does
+                if len(Ti) and np.issubdtype(field_type, np.integer):
+                    info = np.iinfo(field_type)
+                    low, high = Ti[:, i].min(), Ti[:, i].max()
+                    if low < info.min or high > info.max:
+                        raise ValueError(f"Test results [{low}, {high}] out of the range of {name} ({field_type})")
+                entries[name] = Ti[:, i]
+            return entries.tobytes()
+
     @staticmethod
     def encode_selected_tests_bitmask(selected_tests: list[int]) -> int:
         """Encode the list of selected test indexes into a bitmask. Selected tests are represented by a 1.
@@ -272,7 +423,13 @@ class TestResults:
         return selected_tests
 
     @staticmethod
-    def to_bytes(selected_tests: list[int], Tx: list[float], Ti: list[list[float]], p: list[int]) -> bytes:
+    def to_bytes(
+        selected_tests: list[int],
+        Tx: list[float],
+        Ti: list[list[float]] | np.ndarray,
+        p: list[int],
+        complete: bool = True,
+    ) -> bytes:
         """Pack test results into a compact binary representation.
 
         Parameters
@@ -281,10 +438,12 @@ class TestResults:
             The list of selected test indexes
         Tx : list[float]
             The list of reference test results corresponding to the selected tests
-        Ti : list[list[float]]
+        Ti : list[list[float]] | np.ndarray
             A list of test result lists, each containing the selected test results
         p : list[int]
             The lag parameter p
+        complete : bool
+            Whether Ti holds all the test results of the run
 
         Returns
         -------
@@ -293,25 +452,26 @@ class TestResults:
         """
         offset = 0
         # Prepare the output buffer
-        header_fmt, header_size = __class__.Binary.header_format_size()
+        _, header_size = __class__.Binary.header_format_size()
         p_fmt, p_size = __class__.Binary.p_format_size(len(p))
-        entry_fmt, entry_size = __class__.Binary.entry_format_size(selected_tests, p)
+        entry_dtype = __class__.Binary.entry_dtype(selected_tests, p)
+        entry_size = entry_dtype.itemsize
         # Header + Tx + Ti
         b = bytearray(header_size + p_size + entry_size + (len(Ti) * entry_size))
         # Write the header
         selected_tests_bitmask = __class__.encode_selected_tests_bitmask(selected_tests)
-        struct.pack_into(header_fmt, b, offset, len(Ti), selected_tests_bitmask, len(p))
+        b[offset : offset + header_size] = __class__.Binary.pack_header(
+            len(Ti), selected_tests_bitmask, len(p), complete
+        )
         offset += header_size
         # Write p
         struct.pack_into(p_fmt, b, offset, *p)
         offset += p_size
         # Write Tx
-        struct.pack_into(entry_fmt, b, offset, *Tx)
+        b[offset : offset + entry_size] = __class__.Binary.pack_entries(entry_dtype, [Tx])
         offset += entry_size
         # Write Ti
-        for t in Ti:
-            struct.pack_into(entry_fmt, b, offset, *t)
-            offset += entry_size
+        b[offset:] = __class__.Binary.pack_entries(entry_dtype, Ti)
         return bytes(b)
 
     @staticmethod
@@ -336,6 +496,102 @@ class TestResults:
         with open(file, mode="wb") as f:
             f.write(__class__.to_bytes(selected_tests, Tx, Ti, p))
 
+    class BinaryFileWriter:
+        """Writes test results to a binary file block by block, in the representation of TestResults.to_bytes().
+
+        The length of Ti in the header is updated when the writer is flushed or closed. The file is marked as complete
+        only when the writer is closed on the completion of the run, so that a file left by an interrupted run reads
+        as incomplete.
+        """
+
+        def __init__(
+            self, file: str, selected_tests: list[int], Tx: list[float], p: list[int], len_Ti: int = 0
+        ) -> None:
+            """Opens the output file and writes the header, p and Tx.
+
+            If len_Ti is not 0, an existing file is resumed instead: the file is truncated after its first len_Ti test
+            results, and the following ones are appended.
+
+            Parameters
+            ----------
+            file : str
+                The output file name
+            selected_tests : list[int]
+                The list of selected test indexes
+            Tx : list[float]
+                The list of reference test results corresponding to the selected tests
+            p : list[int]
+                The lag parameter p
+            len_Ti : int
+                The number of test results to keep from an existing file
+            """
+            self._selected_tests_bitmask = TestResults.encode_selected_tests_bitmask(selected_tests)
+            self._len_p = len(p)
+            self._entry_dtype = TestResults.Binary.entry_dtype(selected_tests, p)
+            self._entry_size = self._entry_dtype.itemsize
+            self._len_Ti = len_Ti
+            header = TestResults.to_bytes(selected_tests, Tx, [], p, complete=False)
+            if not len_Ti:
+                self._f = open(file, mode="wb")
+                self._f.write(header)
+                return
+            size = len(header) + len_Ti * self._entry_size
+            if os.path.getsize(file) < size:
+                raise ValueError(f"Cannot resume {file}: less than {len_Ti} test results")
+            with open(file, mode="rb") as f:
+                _, _, header_size = TestResults.Binary.unpack_header(f.read(len(header)))
+            if header_size != TestResults.Binary.header_format_size()[1]:
+                raise ValueError(f"Cannot resume {file}: written in an older format version")
+            self._f = open(file, mode="r+b")
+            self._f.truncate(size)
+            self._f.seek(size)
+
+        def write(self, Ti: list[list[float]] | np.ndarray) -> None:
+            """Appends a block of test results.
+
+            Parameters
+            ----------
+            Ti : list[list[float]] | np.ndarray
+                A list of test result lists, or an array with one row of test results per entry
+            """
+            self._f.write(TestResults.Binary.pack_entries(self._entry_dtype, Ti))
+            self._len_Ti += len(Ti)
+
+        def flush(self, complete: bool = False) -> None:
+            """Writes the current length of Ti in the header and flushes the file to disk.
+
+            Parameters
+            ----------
+            complete : bool
+                Whether Ti holds all the test results of the run
+            """
+            offset = self._f.tell()
+            self._f.seek(0)
+            self._f.write(
+                TestResults.Binary.pack_header(self._len_Ti, self._selected_tests_bitmask, self._len_p, complete)
+            )
+            self._f.seek(offset)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+        def close(self, complete: bool = True) -> None:
+            """Writes the final length of Ti in the header and closes the file.
+
+            Parameters
+            ----------
+            complete : bool
+                Whether Ti holds all the test results of the run, False if the run was interrupted
+            """
+            self.flush(complete)
+            self._f.close()
+
+        def __enter__(self) -> "TestResults.BinaryFileWriter":
+            return self
+
+        def __exit__(self, exc_type, *exc) -> None:
+            # An exception, e.g. an interrupt, leaves the run incomplete
+            self.close(complete=exc_type is None)
+
     @staticmethod
     def from_bytes(b: bytes) -> tuple[list[int], list[float], list[list[float]], list[int]]:
         """Read test results from a compact binary representation.
@@ -358,9 +614,8 @@ class TestResults:
                 The lag parameter p
         """
         offset = 0
-        # Read the header
-        header_fmt, header_size = __class__.Binary.header_format_size()
-        len_Ti, selected_tests_bitmask, len_p = struct.unpack_from(header_fmt, b, offset)
+        # Read the header, of any format version
+        (len_Ti, selected_tests_bitmask, len_p), _, header_size = __class__.Binary.unpack_header(b)
         offset += header_size
         selected_tests = __class__.decode_selected_tests_bitmask(selected_tests_bitmask)
         # Read p
@@ -383,6 +638,9 @@ class TestResults:
     def from_binary_file(file: str) -> tuple[list[int], list[float], list[list[float]], list[int]]:
         """Read test results from a binary file.
 
+        A warning is logged if the file is not marked as complete, e.g. if it was left by an interrupted run: Ti then
+        holds only the test results written before the interruption.
+
         Parameters
         ----------
         file : str
@@ -401,7 +659,11 @@ class TestResults:
                 The lag parameter p
         """
         with open(file, mode="rb") as f:
-            return __class__.from_bytes(f.read())
+            b = f.read()
+        (len_Ti, _, _), complete, _ = __class__.Binary.unpack_header(b)
+        if not complete:
+            logger.warning("Test results file (%s) is incomplete: it holds only %s test results", file, len_Ti)
+        return __class__.from_bytes(b)
 
     @staticmethod
     def test_labels(selected_tests: list[int], p: list[int]) -> list[str]:
@@ -419,30 +681,7 @@ class TestResults:
         list[str]
             A list of labels, one for each test, with optional p variants
         """
-        labels = []
-        if permutation_tests.excursion.id in selected_tests:
-            labels.append(permutation_tests.excursion.name)
-        if permutation_tests.n_directional_runs.id in selected_tests:
-            labels.append(permutation_tests.n_directional_runs.name)
-        if permutation_tests.l_directional_runs.id in selected_tests:
-            labels.append(permutation_tests.l_directional_runs.name)
-        if permutation_tests.n_increases_decreases.id in selected_tests:
-            labels.append(permutation_tests.n_increases_decreases.name)
-        if permutation_tests.n_median_runs.id in selected_tests:
-            labels.append(permutation_tests.n_median_runs.name)
-        if permutation_tests.l_median_runs.id in selected_tests:
-            labels.append(permutation_tests.l_median_runs.name)
-        if permutation_tests.avg_collision.id in selected_tests:
-            labels.append(permutation_tests.avg_collision.name)
-        if permutation_tests.max_collision.id in selected_tests:
-            labels.append(permutation_tests.max_collision.name)
-        if permutation_tests.periodicity.id in selected_tests:
-            labels.extend([f"{permutation_tests.periodicity.name}{n}" for n in p])
-        if permutation_tests.covariance.id in selected_tests:
-            labels.extend([f"{permutation_tests.covariance.name}{n}" for n in p])
-        if permutation_tests.compression.id in selected_tests:
-            labels.append(permutation_tests.compression.name)
-        return labels
+        return list(permutation_tests.plan_tests(selected_tests, p).labels)
 
     @staticmethod
     def test_isint(selected_tests: list[int], p: list[int]) -> list[bool]:
@@ -460,41 +699,7 @@ class TestResults:
         list[bool]
             One for each test with optional p variants, true if the test returns an int
         """
-        isint = []
-        if permutation_tests.excursion.id in selected_tests:
-            return_type = permutation_tests.excursion.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.n_directional_runs.id in selected_tests:
-            return_type = permutation_tests.n_directional_runs.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.l_directional_runs.id in selected_tests:
-            return_type = permutation_tests.l_directional_runs.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.n_increases_decreases.id in selected_tests:
-            return_type = permutation_tests.n_increases_decreases.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.n_median_runs.id in selected_tests:
-            return_type = permutation_tests.n_median_runs.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.l_median_runs.id in selected_tests:
-            return_type = permutation_tests.l_median_runs.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.avg_collision.id in selected_tests:
-            return_type = permutation_tests.avg_collision.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.max_collision.id in selected_tests:
-            return_type = permutation_tests.max_collision.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        if permutation_tests.periodicity.id in selected_tests:
-            return_type = permutation_tests.periodicity.run.__annotations__.get("return", None)
-            isint.extend([return_type is int for n in p])
-        if permutation_tests.covariance.id in selected_tests:
-            return_type = permutation_tests.covariance.run.__annotations__.get("return", None)
-            isint.extend([return_type is int for n in p])
-        if permutation_tests.compression.id in selected_tests:
-            return_type = permutation_tests.compression.run.__annotations__.get("return", None)
-            isint.append(return_type is int)
-        return isint
+        return [t is int for t in permutation_tests.plan_tests(selected_tests, p).result_types]
 
     @staticmethod
     def to_json(selected_tests: list[int], Tx: list[float], Ti: list[list[float]], p: list[int]) -> str:
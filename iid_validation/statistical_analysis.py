@@ -1,122 +1,305 @@
+import contextlib
 import logging
 import pathlib
 import time
+import typing
 
+import numpy as np
 from tqdm import tqdm
 
-from . import config, permutation_tests, plot, read, save
+from . import config, permutation_tests, permutation_tests_numpy, plot, read, save
 
 # Configure per-module logger
 logger = logging.getLogger(f"IID_validation.{pathlib.Path(__file__).stem}")
 
 
-def calculate_counters_TjNorm(conf: config.Config, S: list[int], Ti: list[list[float]]) -> tuple[list[int], list[int]]:
+def calculate_counters_TjNorm(
+    conf: config.Config,
+    S: list[int] | np.ndarray,
+    Ti: list[list[float]],
+    iteration: int = 0,
+    profile: permutation_tests.SequenceProfile | None = None,
+    pool: permutation_tests.WorkerPool | None = None,
+) -> tuple[list[int], list[int]]:
     """Compute the counters C0 and C1 for a given reference list of values Ti with the TjNorm method.
     The elements of Ti are considered in non-overlapping pairs: the couples with the same Ti values are discarded and
     replaced, then if the first element of the pair is bigger that the following one, C0 is incremented; if they are
     equal C1 is.
 
+    The replacement values of each test are taken in order from its reserve, the values of the test on permutations
+    drawn from the (STREAM_STAT_TJNORM, iteration, test id) random stream. The reserves are extended as needed in blocks
+    of permutations, computed at once (in a batch, or on the pool if provided), and all the tied pairs of a test are
+    replaced at once.
+
     Parameters
     ----------
     conf : config.Config
         application configuration parameters
-    S : list of int
+    S : list of int or np.ndarray
         sequence of symbols
     Ti : list of list of float
         list of values to compare for each test
+    iteration : int
+        index of the statistical analysis iteration
+    profile : permutation_tests.SequenceProfile | None
+        the profile of the sequence, computed if None
+    pool : permutation_tests.WorkerPool | None
+        the pool computing the reserves, the calling process if None
 
     Returns
     -------
     list of int, list of int
         counter 0 and counter 1
     """
-    C0 = [0] * len(conf.stat.selected_tests)
-    C1 = [0] * len(conf.stat.selected_tests)
-
-    for u in range(len(conf.stat.selected_tests)):
-        for z in range(0, len(Ti) - 1, 2):
-            n_tries = 0
-            # If a pair of consecutive results is identical, we cannot use it for the Tj method.
-            # Discard and recalculate them both. Only do this up to a maximum n_permutations number of times for sanity
-            # (if we have to regenerate more results for this pair than we generated in total, something is wrong).
-            while Ti[z][u] == Ti[z + 1][u]:
-                n_tries += 1
-                if n_tries > conf.stat.n_permutations:
-                    logger.error("TjNorm method exceeded maximum number of tries %s", conf.stat.n_permutations)
-                    raise RuntimeError("TjNorm method failed")
-                Ti[z][u] = permutation_tests.run_tests_shuffle(S, [conf.stat.p], [conf.stat.selected_tests[u]])[0]
-                Ti[z + 1][u] = permutation_tests.run_tests_shuffle(S, [conf.stat.p], [conf.stat.selected_tests[u]])[0]
-
-            if Ti[z][u] > Ti[z + 1][u]:
-                C0[u] += 1
-            if Ti[z][u] == Ti[z + 1][u]:
-                C1[u] += 1
-
-    return C0, C1
-
-
-def statistical_analysis_function(conf: config.Config) -> None:
+    if profile is None:
+        profile = permutation_tests.sequence_profile(S)
+    n_tests = len(conf.stat.selected_tests)
+
+    T = np.array(Ti, dtype=np.float64).reshape(len(Ti), n_tests)
+    n_pairs = len(T) // 2
+    first, second = T[0 : 2 * n_pairs : 2], T[1 : 2 * n_pairs : 2]
+    # Reserve of each test, and index of its next unused value
+    reserves = [np.empty(0) for _ in range(n_tests)]
+    cursors = [0] * n_tests
+    n_tries = np.zeros((n_pairs, n_tests), dtype=np.int64)
+
+    # If a pair of consecutive results is identical, we cannot use it for the Tj method.
+    # Discard and recalculate them both. Only do this up to a maximum n_permutations number of times for sanity
+    # (if we have to regenerate more results for this pair than we generated in total, something is wrong).
+    tied = first == second
+    while np.any(tied):
+        n_tries += tied
+        if np.any(n_tries > conf.stat.n_permutations):
+            logger.error("TjNorm method exceeded maximum number of tries %s", conf.stat.n_permutations)
+            raise RuntimeError("TjNorm method failed")
+
+        for u in range(n_tests):
+            pairs = np.flatnonzero(tied[:, u])
+            if len(pairs) == 0:
+                continue
+            n_needed = cursors[u] + 2 * len(pairs)
+            if n_needed > len(reserves[u]):
+                # At least twice the shortfall, so that the retries of the next rounds are likely already available
+                n_block = max(2 * (n_needed - len(reserves[u])), len(reserves[u]))
+                block = _reserve_block(conf, S, u, iteration, len(reserves[u]), n_block, profile, pool)
+                reserves[u] = np.concatenate((reserves[u], block))
+            values = reserves[u][cursors[u] : n_needed]
+            first[pairs, u] = values[0::2]
+            second[pairs, u] = values[1::2]
+            cursors[u] = n_needed
+        tied = first == second
+
+    C0 = np.count_nonzero(first > second, axis=0)
+    C1 = np.count_nonzero(first == second, axis=0)
+    return C0.tolist(), C1.tolist()
+
+
+def _reserve_block(
+    conf: config.Config,
+    S: list[int] | np.ndarray,
+    u: int,
+    iteration: int,
+    start: int,
+    n_permutations: int,
+    profile: permutation_tests.SequenceProfile,
+    pool: permutation_tests.WorkerPool | None,
+) -> np.ndarray:
+    """Computes the values of the u-th selected test on n_permutations permutations of its TjNorm random stream, from
+    the start-th.
+
+    Without a pool, the NumPy backend tests the whole block as a single batch, within the memory limit of batches.
+
+    Returns
+    -------
+    np.ndarray
+        test values
+    """
+    test = conf.stat.selected_tests[u]
+    stream = (permutation_tests.STREAM_STAT_TJNORM, iteration, test)
+    if pool is None:
+        batch_size = conf.batch_size
+        if conf.backend == permutation_tests.BACKEND_NUMPY:
+            batch_size = min(max(batch_size, n_permutations), permutation_tests_numpy.max_batch_size(len(S)))
+        values = permutation_tests.run_tests_chunk(
+            S, [conf.stat.p], [test], conf.backend, batch_size, conf.seed, stream, start, n_permutations, profile
+        )
+    else:
+        values = permutation_tests.run_tests_permutations(
+            S,
+            start + n_permutations,
+            [test],
+            [conf.stat.p],
+            standalone_progress=False,
+            backend=conf.backend,
+            batch_size=conf.batch_size,
+            chunk_size=conf.chunk_size,
+            seed=conf.seed,
+            stream=stream,
+            profile=profile,
+            pool=pool,
+            first=start,
+        )
+    return np.array(values, dtype=np.float64).reshape(n_permutations)
+
+
+IterationCounters = typing.NamedTuple(
+    "IterationCounters",
+    [
+        ("C0_Tx", list[int]),
+        ("C1_Tx", list[int]),
+        ("C0_TjNorm", list[int]),
+        ("C1_TjNorm", list[int]),
+        ("process_time_Tx", float),
+        ("process_time_TjNorm", float),
+    ],
+)
+
+
+def iteration_counters(
+    S: list[int] | np.ndarray,
+    conf: config.Config,
+    Tx: list[float],
+    iteration: int,
+    profile: permutation_tests.SequenceProfile | None = None,
+    pool: permutation_tests.WorkerPool | None = None,
+) -> IterationCounters:
+    """Computes the counters of an iteration of the statistical analysis with the Tx and TjNorm methods.
+
+    Parameters
+    ----------
+    S : list of int or np.ndarray
+        sequence of symbols
+    conf : config.Config
+        application configuration parameters
+    Tx : list of float
+        reference values of the tests on the sequence
+    iteration : int
+        index of the statistical analysis iteration
+    profile : permutation_tests.SequenceProfile | None
+        the profile of the sequence, computed if None
+    pool : permutation_tests.WorkerPool | None
+        the pool running the permutations, the calling process if None
+
+    Returns
+    -------
+    IterationCounters
+        counters of the Tx and TjNorm methods, and process time spent to compute each of them
+    """
+    # S is passed through unchanged, so that all the iterations of a worker reuse the shuffle buffers of the sequence
+    if profile is None:
+        profile = permutation_tests.sequence_profile(S)
+    stream = (permutation_tests.STREAM_STAT, iteration)
+
+    t0 = time.process_time()
+    if pool is None:
+        batch_size = min(conf.batch_size, permutation_tests_numpy.max_batch_size(len(S)))
+        Ti = permutation_tests.run_tests_chunk(
+            S,
+            [conf.stat.p],
+            conf.stat.selected_tests,
+            conf.backend,
+            batch_size,
+            conf.seed,
+            stream,
+            0,
+            conf.stat.n_permutations,
+            profile,
+        )
+    else:
+        Ti = permutation_tests.run_tests_permutations(
+            S,
+            conf.stat.n_permutations,
+            conf.stat.selected_tests,
+            [conf.stat.p],
+            standalone_progress=False,
+            backend=conf.backend,
+            batch_size=conf.batch_size,
+            chunk_size=conf.chunk_size,
+            seed=conf.seed,
+            stream=stream,
+            profile=profile,
+            pool=pool,
+        )
+    t1 = time.process_time()
+    C0_Tx, C1_Tx = permutation_tests.calculate_counters(Tx, Ti)
+    t2 = time.process_time()
+    C0_TjNorm, C1_TjNorm = calculate_counters_TjNorm(conf, S, Ti, iteration, profile, pool)
+    t3 = time.process_time()
+    return IterationCounters(C0_Tx, C1_Tx, C0_TjNorm, C1_TjNorm, t2 - t0, t3 - t2 + t1 - t0)
+
+
+def statistical_analysis_function(conf: config.Config, pool: permutation_tests.WorkerPool | None = None) -> None:
     """Performs the statistical analysis procedure.
 
+    The permutations of each iteration run in parallel on the pool of workers or, if conf.stat.parallel_iterations is
+    enabled, each worker runs whole iterations and only returns their counters.
+
     Parameters
     ----------
     conf : config.Config
         application configuration parameters
+    pool : permutation_tests.WorkerPool | None
+        the pool running the permutations, a new pool for the analysis if None
     """
     stat_tests_names = [permutation_tests.tests[t].name for t in conf.stat.selected_tests]
     logger.debug("STATISTICAL ANALYSIS FOR TESTS %s", stat_tests_names)
     S = read.read_file(conf.input_file, conf.stat.n_symbols)
     logger.debug("Read a sequence of %s symbols from file (%s) ", conf.stat.n_symbols, conf.input_file)
 
+    # The permutation-invariant quantities are shared by all the iterations
+    profile = permutation_tests.sequence_profile(S)
+
     logger.debug("Calculating the selected test reference statistics (Tx) on the input sequence")
-    Tx = permutation_tests.run_tests(S, [conf.stat.p], conf.stat.selected_tests)
+    Tx = permutation_tests.run_tests(S, [conf.stat.p], conf.stat.selected_tests, conf.backend, profile)
     logger.debug("Reference statistics calculated!")
 
     logger.debug("Building the counter's population")
     counters_C0_Tx = [[]] * conf.stat.n_iterations
     counters_C0_TjNorm = [[]] * conf.stat.n_iterations
-    for i in tqdm(range(conf.stat.n_iterations), desc="Running statistical analysis", position=0):
-        # Calculate counters for Tx and TjNorm methods
-        t0 = time.process_time()
-        Ti = permutation_tests.run_tests_permutations(
-            S,
-            conf.stat.n_permutations,
-            conf.stat.selected_tests,
-            [conf.stat.p],
-            conf.parallel,
-            standalone_progress=False,
-        )
-        t1 = time.process_time()
-        C0_Tx, C1_Tx = permutation_tests.calculate_counters(Tx, Ti)
-        t2 = time.process_time()
-        C0_TjNorm, C1_TjNorm = calculate_counters_TjNorm(conf, S, Ti)
-        t3 = time.process_time()
-        IID_assumption_Tx = permutation_tests.iid_result(C0_Tx, C1_Tx, conf.stat.n_permutations)
-        IID_assumption_TjNorm = permutation_tests.iid_result(C0_TjNorm, C1_TjNorm, int(conf.stat.n_permutations / 2))
-        # Save the values of the counters
-        save.save_counters(
-            conf.stat.n_symbols,
-            conf.stat.n_permutations,
-            conf.stat.selected_tests,
-            C0_Tx,
-            C1_Tx,
-            IID_assumption_Tx,
-            t2 - t0,
-            "countersTx_distribution",
-        )
-        save.save_counters(
-            conf.stat.n_symbols,
-            conf.stat.n_permutations,
-            conf.stat.selected_tests,
-            C0_TjNorm,
-            C1_TjNorm,
-            IID_assumption_TjNorm,
-            t3 - t2 + t1 - t0,
-            "countersTj_distribution",
-        )
+    with contextlib.ExitStack() as stack:
+        if pool is None:
+            pool = stack.enter_context(permutation_tests.WorkerPool(conf.executor, conf.workers))
+        if conf.stat.parallel_iterations and pool.executor != permutation_tests.EXECUTOR_SERIAL:
+            S_task = pool.sequence(S)
+            futures = [
+                pool.submit(iteration_counters, S_task, conf, Tx, i, profile) for i in range(conf.stat.n_iterations)
+            ]
+            # The counters are saved in iteration order
+            iterations = (future.result() for future in futures)
+        else:
+            iterations = (iteration_counters(S, conf, Tx, i, profile, pool) for i in range(conf.stat.n_iterations))
+
+        for i, counters in enumerate(
+            tqdm(iterations, total=conf.stat.n_iterations, desc="Running statistical analysis", position=0)
+        ):
+            IID_assumption_Tx = permutation_tests.iid_result(counters.C0_Tx, counters.C1_Tx, conf.stat.n_permutations)
+            IID_assumption_TjNorm = permutation_tests.iid_result(
+                counters.C0_TjNorm, counters.C1_TjNorm, int(conf.stat.n_permutations / 2)
+            )
+            # Save the values of the counters
+            save.save_counters(
+                conf.stat.n_symbols,
+                conf.stat.n_permutations,
+                conf.stat.selected_tests,
+                counters.C0_Tx,
+                counters.C1_Tx,
+                IID_assumption_Tx,
+                counters.process_time_Tx,
+                "countersTx_distribution",
+            )
+            save.save_counters(
+                conf.stat.n_symbols,
+                conf.stat.n_permutations,
+                conf.stat.selected_tests,
+                counters.C0_TjNorm,
+                counters.C1_TjNorm,
+                IID_assumption_TjNorm,
+                counters.process_time_TjNorm,
+                "countersTj_distribution",
+            )
 
-        counters_C0_Tx[i] = C0_Tx
-        counters_C0_TjNorm[i] = C0_TjNorm
+            counters_C0_Tx[i] = counters.C0_Tx
+            counters_C0_TjNorm[i] = counters.C0_TjNorm
 
     logger.info("Counters population built!")
 
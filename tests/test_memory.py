@@ -0,0 +1,48 @@
+import hashlib
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from iid_validation import permutation_tests
+
+N_SYMBOLS = 50000
+N_PERMUTATIONS = 2
+P = [1, 2, 8, 16, 32]
+# The compression is left out: bz2 allocates a working memory of a few MB for each sequence, whatever its length
+TESTS = [t.id for t in permutation_tests.tests if t.id != permutation_tests.compression.id]
+
+# Upper bounds on the memory allocated while testing shuffled sequences once the buffers of the sequence are allocated:
+# the peak of the allocations of N_PERMUTATIONS permutations, and the allocations left once they are done
+PEAK_BYTES = {
+    # The shuffled sequence and all its intermediates are written into the buffers, about 75 kB in all, where a single
+    # list of N_SYMBOLS items takes 400 kB
+    permutation_tests.BACKEND_PYTHON: 128 * 1024,
+    # The kernels allocate their temporary arrays, about 2.3 MB in all
+    permutation_tests.BACKEND_NUMPY: 3 * 1024 * 1024,
+}
+RETAINED_BYTES = 16 * 1024
+
+
+@pytest.mark.parametrize("backend", PEAK_BYTES)
+def test_shuffle_memory_budget(backend: str) -> None:
+    S = np.frombuffer(hashlib.shake_128(b"memory").digest(N_SYMBOLS), dtype=np.uint8)
+    if backend == permutation_tests.BACKEND_PYTHON:
+        S = S.tolist()
+    profile = permutation_tests.sequence_profile(S)
+
+    def run(start: int, n_permutations: int) -> None:
+        permutation_tests.run_tests_chunk(S, P, TESTS, backend, 1, 1, (0,), start, n_permutations, profile)
+
+    # Allocates the shuffle buffers of the sequence in this thread
+    run(0, 1)
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        run(1, N_PERMUTATIONS)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak - baseline < PEAK_BYTES[backend]
+    assert current - baseline < RETAINED_BYTES
@@ -0,0 +1,149 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from iid_validation import permutation_tests
+
+
+def symbols(name: str, n: int, bits: int) -> list[int]:
+    """Returns a fixed pseudo-random sequence of n symbols of the given number of bits, drawn from SHAKE-128 so that it
+    does not depend on the version of any random number generator."""
+    return [b & ((1 << bits) - 1) for b in hashlib.shake_128(name.encode()).digest(n)]
+
+
+# Sequences, lag parameters p, and values of all the tests of the registry in order, computed with the python backend
+GOLDEN = {
+    "bytes": (
+        symbols("bytes", 2000, 8),
+        [1, 2, 8, 16, 32],
+        [3300.6754999999976, 1304, 6, 1015, 970, 10, 21.706521739130434, 49]
+        + [6, 8, 5, 8, 10, 33903859, 33275986, 33432327, 33013382, 32929583, 2310],
+    ),
+    "nibbles": (
+        symbols("nibbles", 1000, 4),
+        [1, 2, 8, 16, 32],
+        [104.38599999999951, 645, 5, 528, 498, 10, 5.780346820809249, 12]
+        + [71, 50, 55, 62, 56, 55941, 55021, 54747, 54023, 54349, 610],
+    ),
+    "bits": (
+        symbols("bits", 500, 1),
+        [1, 2, 8],
+        [7.504000000000005, 233, 9, 383, 233, 9, 2.4630541871921183, 3, 267, 253, 263, 136, 129, 134, 128],
+    ),
+    # Every pair of samples is a collision, and every run is as long as the sequence
+    "constant": ([7] * 100, [1, 2], [0.0, 1, 99, 99, 1, 100, 2.0, 2, 99, 98, 4851, 4802, 42]),
+    # Lags as long as the sequence or longer, which have no pairs of samples
+    "short": (symbols("short", 8, 4), [8, 16], [11.25, 4, 3, 4, 3, 3, 3, 3, 0, 0, 0, 0, 46]),
+}
+
+# Without any repeated symbol, the sequence has no collision
+DISTINCT = list(range(200))
+DISTINCT_GOLDEN = {
+    permutation_tests.excursion.id: 5000.0,
+    permutation_tests.n_directional_runs.id: 1,
+    permutation_tests.l_directional_runs.id: 199,
+    permutation_tests.n_increases_decreases.id: 199,
+    permutation_tests.n_median_runs.id: 2,
+    permutation_tests.l_median_runs.id: 100,
+    permutation_tests.periodicity.id: 0,
+    permutation_tests.covariance.id: 2626800,
+    permutation_tests.compression.id: 235,
+}
+
+ALL_TESTS = [t.id for t in permutation_tests.tests]
+
+
+@pytest.fixture(params=permutation_tests.BACKENDS)
+def backend(request: pytest.FixtureRequest) -> str:
+    if request.param == permutation_tests.BACKEND_NUMBA:
+        pytest.importorskip("numba")
+    return request.param
+
+
+def sequence(S: list[int], backend: str) -> list[int] | np.ndarray:
+    """Returns a sequence in the type tested by a backend."""
+    return S if backend == permutation_tests.BACKEND_PYTHON else np.array(S, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("case", GOLDEN)
+def test_golden_values(backend: str, case: str) -> None:
+    S, p, expected = GOLDEN[case]
+    result = permutation_tests.run_tests(sequence(S, backend), p, ALL_TESTS, backend)
+    assert result == expected
+
+    result_types = permutation_tests.plan_tests(ALL_TESTS, p).result_types
+    for value, result_type in zip(result, result_types):
+        if result_type is int:
+            assert isinstance(value, int)
+        else:
+            assert isinstance(value, (int, float))
+
+
+@pytest.mark.parametrize("case", GOLDEN)
+def test_profile_does_not_change_values(backend: str, case: str) -> None:
+    S, p, expected = GOLDEN[case]
+    S = sequence(S, backend)
+    profile = permutation_tests.sequence_profile(S)
+    assert permutation_tests.run_tests(S, p, ALL_TESTS, backend, profile) == expected
+
+
+@pytest.mark.parametrize("test", permutation_tests.tests, ids=lambda t: t.name)
+def test_single_test(backend: str, test: permutation_tests._Test) -> None:
+    S, p, expected = GOLDEN["bytes"]
+    plan = permutation_tests.plan_tests(ALL_TESTS, p)
+    values = dict(zip(plan.labels, expected))
+    result = permutation_tests.run_tests(sequence(S, backend), p, [test.id], backend)
+    assert result == [values[label] for label in permutation_tests.plan_tests([test.id], p).labels]
+
+
+def test_no_collision(backend: str) -> None:
+    S = sequence(DISTINCT, backend)
+    tests = list(DISTINCT_GOLDEN)
+    assert permutation_tests.run_tests(S, [1], tests, backend) == list(DISTINCT_GOLDEN.values())
+
+    for test in (permutation_tests.avg_collision, permutation_tests.max_collision):
+        with pytest.raises(ValueError, match="No collision"):
+            permutation_tests.run_tests(S, [1], [test.id], backend)
+
+
+def test_shuffled_values_match_numpy(backend: str) -> None:
+    # The numba backend shuffles the sequences like the numpy backend, the python backend with its own generator
+    if backend == permutation_tests.BACKEND_PYTHON:
+        pytest.skip("the python backend draws different permutations")
+    S, p, _ = GOLDEN["nibbles"]
+    S = np.array(S, dtype=np.uint8)
+    expected = permutation_tests.run_tests_chunk(
+        S, p, ALL_TESTS, permutation_tests.BACKEND_NUMPY, 1, 5, (0,), 0, 4, None
+    )
+    result = permutation_tests.run_tests_chunk(S, p, ALL_TESTS, backend, 1, 5, (0,), 0, 4, None)
+    assert np.array_equal(result, expected)
+
+
+def test_histogram_integer_bins() -> None:
+    histogram = permutation_tests.Histogram()
+    histogram.add([5, 6, 6, 6, 8])
+    assert histogram.width < 1
+    histogram.coarsen(16)
+    assert histogram.width == 1
+    # Each integer k is counted in the bin [k - 0.5, k + 0.5)
+    edges = histogram.edges()
+    assert edges[:5].tolist() == [4.5, 5.5, 6.5, 7.5, 8.5]
+    assert histogram.counts[:4].tolist() == [1, 3, 0, 1]
+
+
+def test_histogram_covers_the_values() -> None:
+    values = np.random.default_rng(0).normal(600, 100, 1000)
+    histogram = permutation_tests.Histogram()
+    histogram.add(values)
+    # The bins spread over the range of the values, wherever the reference value of the test is
+    assert np.count_nonzero(histogram.counts) > permutation_tests.HISTOGRAM_BINS // 2
+    assert np.array_equal(np.histogram(values, histogram.edges())[0], histogram.counts)
+
+    # The histogram does not depend on how the values are split and merged
+    merged = permutation_tests.Histogram()
+    for block in np.array_split(values[::-1], 7):
+        partial = permutation_tests.Histogram()
+        partial.add(block)
+        merged.merge(partial)
+    assert merged.state() == histogram.state()
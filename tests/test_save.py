@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from iid_validation import permutation_tests, save
+
+Binary = save.TestResults.Binary
+
+
+def test_pack_entries_integer_range() -> None:
+    # The integer test values are stored as unsigned 32-bit integers, the float ones as doubles
+    entry_dtype = Binary.entry_dtype([permutation_tests.excursion.id, permutation_tests.covariance.id], [1])
+    entries = Binary.pack_entries(entry_dtype, [[2.0**40, 2**32 - 1], [0.5, 0]])
+    assert np.frombuffer(entries, dtype=entry_dtype).tolist() == [(2.0**40, 2**32 - 1), (0.5, 0)]
+
+    for value in (2**32, -1):
+        with pytest.raises(ValueError, match="out of the range"):
+            Binary.pack_entries(entry_dtype, [[0.0, value]])
+
+
+def test_binary_file_completion(tmp_path, caplog: pytest.LogCaptureFixture) -> None:
+    file = str(tmp_path / "test_values.bin")
+    tests = [permutation_tests.excursion.id, permutation_tests.periodicity.id]
+    p = [1, 2]
+    Tx = [1.5, 3, 4]
+    Ti = [[2.5, 1, 2], [0.5, 5, 6]]
+
+    # An interrupted run leaves the test results written so far, marked as incomplete
+    with pytest.raises(KeyboardInterrupt):
+        with save.TestResults.BinaryFileWriter(file, tests, Tx, p) as writer:
+            writer.write(Ti[:1])
+            raise KeyboardInterrupt
+    assert save.TestResults.from_binary_file(file) == (tests, Tx, Ti[:1], p)
+    assert "incomplete" in caplog.text
+
+    # Resuming and completing the run marks the file as complete
+    caplog.clear()
+    with save.TestResults.BinaryFileWriter(file, tests, Tx, p, len_Ti=1) as writer:
+        writer.write(Ti[1:])
+    assert save.TestResults.from_binary_file(file) == (tests, Tx, Ti, p)
+    assert "incomplete" not in caplog.text
+    with open(file, "rb") as f:
+        assert f.read() == save.TestResults.to_bytes(tests, Tx, Ti, p)